@@ -1,4 +1,29 @@
+import hashlib, urllib.parse
+import JapaneseNewsScraperConstants as constants
+
+def normalizeUrl(url):
+	""" Returns the URL with the scheme, letter case of the host, default port, fragment, tracking parameters, and parameter order normalized away. """
+	parts = urllib.parse.urlsplit(url.strip())
+	host = parts.hostname or ''
+	if parts.port and parts.port not in (80, 443):
+		host += ':%d' % parts.port
+	query = sorted((key, value) for (key, value) in urllib.parse.parse_qsl(parts.query, keep_blank_values=True) if not isTrackingParameter(key))
+	path = parts.path.rstrip('/') or '/'
+	return urllib.parse.urlunsplit(('', host, path, urllib.parse.urlencode(query), ''))
+
+def isTrackingParameter(key):
+	key = key.lower()
+	return key in constants.TRACKING_PARAMETERS or key.startswith('utm_')
+
+def getArticleHash(title, pubDatetime, body):
+	""" Returns the compact key of a News Article: a 16 byte digest of its Title, PubDatetime, and Body, the columns that keyed version 1 of the schema. """
+	return hashlib.blake2b("\x1f".join((str(title), str(pubDatetime), str(body))).encode('UTF-8'), digest_size=16).digest()
+
 class newsArticle:
+	""" A News Article. Two News Articles are equal when their normalized URLs are, so a set of News Articles holds each story once.
+	Attributes are kept in slots rather than a per-instance dict. The normalized URL key and the insert tuple, which are costly to derive,
+	are computed on first use and kept until a setter changes what they were computed from. """
+	__slots__ = ('__title', '__pubDatetime', '__url', '__body', '__genre', '__source', '__imgUrl', '__compressedBody', '__key', '__insertCache')
 	def __init__(self, title, pubDatetime, url):
 		self.__title = title
 		self.__pubDatetime = pubDatetime
@@ -7,10 +32,34 @@ class newsArticle:
 		self.__genre = None
 		self.__source = None
 		self.__imgUrl = None
+		self.__compressedBody = None
+		self.__key = None
+		self.__insertCache = None
+	@classmethod
+	def fromTuples(cls, titlePubdateUrl, genre=None, source=None):
+		""" Returns a list of News Articles from (Title, PubDatetime, URL) tuples, all of the Genre and Source if given. """
+		articles = []
+		for (title, pubDatetime, url) in titlePubdateUrl:
+			article = cls(title, pubDatetime, url)
+			article.__genre = genre
+			article.__source = source
+			articles.append(article)
+		return articles
 	def __str__(self):
-		return self.__title + "|" + str(self.__pubDatetime) + "|" + str(self.__url)
+		return self.__title + "|" + self.getPubDatetime() + "|" + str(self.__url)
 	def __repr__(self):
-		return self.__title + "|" + str(self.__pubDatetime)
+		return self.__title + "|" + self.getPubDatetime()
+	def __eq__(self, other):
+		if not isinstance(other, newsArticle):
+			return NotImplemented
+		return self.getKey() == other.getKey()
+	def __hash__(self):
+		return hash(self.getKey())
+	def getKey(self):
+		""" Returns the normalized URL that identifies the News Article. """
+		if self.__key is None:
+			self.__key = normalizeUrl(str(self.__url))
+		return self.__key
 	def getTitle(self):
 		return self.__title
 	def getUrl(self):
@@ -18,24 +67,43 @@ class newsArticle:
 	def getPubDatetime(self):
 		return str(self.__pubDatetime)
 	def getBody(self):
+		if self.__compressedBody is not None:
+			compressedBody, bodyCodec = self.__compressedBody
+			self.__body = bodyCodec.decompress(compressedBody)
+			self.__compressedBody = None
 		return self.__body
 	def setBody(self, body):
 		self.__body = body
+		self.__compressedBody = None
+		self.__insertCache = None
+	def setCompressedBody(self, compressedBody, bodyCodec):
+		""" Sets the body as stored compressed in the database. It is decompressed with the codec when first read. """
+		self.__body = None
+		self.__compressedBody = (compressedBody, bodyCodec)
+		self.__insertCache = None
 	def getGenre(self):
 		return self.__genre
 	def setGenre(self, genre):
 		self.__genre = genre
+		self.__insertCache = None
 	def getSource(self):
 		return self.__source
 	def setSource(self, source):
 		self.__source = source
+		self.__insertCache = None
 	def getImgUrl(self):
 		return self.__imgUrl
 	def setImgUrl(self, imgUrl):
 		self.__imgUrl = imgUrl
-	def getInsertTuple(self):
-		insertTuple = (self.__title, self.__body, self.__url, self.__pubDatetime, self.__genre, self.__source, self.__imgUrl)
+		self.__insertCache = None
+	def getInsertTuple(self, bodyCodec=None):
+		""" Returns the ARTICLES row of the News Article, with the body compressed by the codec if one is given. """
+		if self.__insertCache is not None and self.__insertCache[0] is bodyCodec:
+			return self.__insertCache[1]
+		body = self.getBody()
+		storedBody = bodyCodec.compress(body) if bodyCodec is not None else body
+		insertTuple = (self.__title, storedBody, self.__url, self.__pubDatetime, self.__genre, self.__source, self.__imgUrl, getArticleHash(self.__title, self.__pubDatetime, body))
+		self.__insertCache = (bodyCodec, insertTuple)
 		return insertTuple
 	def getCheckTuple(self):
-		checkTuple = (self.__title, self.__pubDatetime)
-		return checkTuple
+		return (self.__title, self.__pubDatetime)
@@ -4,150 +4,352 @@
 # in a database (including but not limited to Title, Publication Datetime, Body). 
 
 ############# Libraries ########################
-import urllib.request, re, sqlite3, datetime, traceback, logging, time, os
+import http.client, re, sqlite3, datetime, traceback, logging, logging.handlers, time, os, functools, argparse, sys, signal, threading
 import JapaneseNewsScraperParser as parser, JapaneseNewsScraperValidation as valid
+import JapaneseNewsScraperParseWorker as parseworker
+import JapaneseNewsScraperFetcher as fetcher, JapaneseNewsScraperDatabase as storage, JapaneseNewsScraperDedup as dedup
+import JapaneseNewsScraperSeenStore as seenstore, JapaneseNewsScraperSearch as search, JapaneseNewsScraperSchema as schema
+import JapaneseNewsScraperBodyStore as bodystore, JapaneseNewsScraperResponseCache as responsecache
+import JapaneseNewsScraperMetrics as instrumentation, JapaneseNewsScraperScheduler as scheduler
 from JapaneseNewsArticle import newsArticle
 import JapaneseNewsScraperConstants as constants 
 from datetime import date, datetime
-from bs4 import BeautifulSoup
+
+logger = logging.getLogger('JapaneseNewsScraper')
+metrics = instrumentation.runMetrics()
 
 def scrapeNews():
-	""" Main function of the JapaneseNewsScraper. Starts logging, establishes database connection, gets news articles form website sources, commits new articles to the database, and then closes the database.	"""
+	""" Main function of the JapaneseNewsScraper. Starts logging, establishes database connection, gets news articles form website sources, commits new articles to the database, and then closes the database.
+	The stages are chained as generators, so each News Article streams from its RSS Page through de-duplication and body retrieval into the database while later RSS Pages are still being fetched.	"""
+
+	runName = startLogger()
+	startMetrics()
+	conn, db = createDbConnection(constants.DATABASE_NAME)
+	validators = fetcher.validatorStore(constants.VALIDATOR_STORE_NAME)
+	seen = seenstore.seenUrlStore(conn, constants.SEEN_URL_BLOOM_NAME)
+	cache = responsecache.responseCache() if constants.RESPONSE_CACHE else None
+	with parseworker.parsePool() as parsers, fetcher.fetchEngine(validators=validators, cache=cache, metrics=metrics) as engine:
+		newsArticles = getNewsArticles( db, constants.URL_GENRE_SOURCE, engine, parsers, seen )
+		processNewsArticles(conn, newsArticles, engine, parsers, seen, bodystore.bodyStore(conn).getWriteCodec())
+	seen.save()
+	validators.save()
+	if cache is not None:
+		cache.close()
+	closeDbConnection(db)
+	writeRunSummary(runName)
+	stopLogger()
+
+def replayNews(database=None, cacheDirectory=None):
+	""" Runs the scrape again from the response cache, without any network requests. Every cached version of each RSS Page is parsed, oldest first,
+	and the bodies of their News Articles are parsed from the cached News Article pages, into the specified database. Replaying into a new database
+	re-extracts the whole cached history with the current parsers. """
 
-	startLogger()
-	conn, db = createDbConnection(constants.DATABASE_NAME, constants.CREATE_TABLE)
-	newsArticles = getNewsArticles( db, constants.URL_GENRE_SOURCE )
-	processNewsArticles(conn, db, newsArticles)
+	runName = startLogger()
+	startMetrics()
+	database = database or constants.REPLAY_DATABASE_NAME
+	conn, db = createDbConnection(database)
+	seen = seenstore.seenUrlStore(conn, os.path.splitext(database)[0] + '.bloom')
+	with responsecache.responseCache(cacheDirectory) as cache, parseworker.parsePool() as parsers, responsecache.replayEngine(cache) as engine:
+		urlGenreSource = [ (url, genre, source) for (url, genre, source) in constants.URL_GENRE_SOURCE for digest in cache.getVersions(url) ]
+		logAndPrintMessage("Replaying %d cached RSS Page(s) into %s." % (len(urlGenreSource), database))
+		newsArticles = getNewsArticles( db, urlGenreSource, engine, parsers, seen )
+		processNewsArticles(conn, newsArticles, engine, parsers, seen, bodystore.bodyStore(conn).getWriteCodec())
+	seen.save()
 	closeDbConnection(db)
+	writeRunSummary(runName)
+	stopLogger()
+
+def runDaemon(maxSeconds=None):
+	""" Runs the JapaneseNewsScraper as a resident process, polling each RSS Page on its own adaptive interval until stopped with SIGINT or SIGTERM, or after maxSeconds.
+	The database connection, parse workers, keep-alive connections, dedup index, and URL seen-store stay warm between polls, and requests to each host are spaced to stay within its rate limit.
+	Stopping takes effect within a poll: no further RSS Pages or bodies are requested, and the News Articles already retrieved are written. A second SIGINT or SIGTERM is handled as it was before the daemon started, so a second Ctrl-C aborts at once.
+	When a poll leaves News Articles to be tried again, or is cut short, the validators of its RSS Pages are dropped, so that the next poll parses them in full rather than getting 304s. """
+
+	runName = startLogger()
+	startMetrics()
+	conn, db = createDbConnection(constants.DATABASE_NAME)
+	validators = fetcher.validatorStore(constants.VALIDATOR_STORE_NAME)
+	seen = seenstore.seenUrlStore(conn, constants.SEEN_URL_BLOOM_NAME)
+	cache = responsecache.responseCache() if constants.RESPONSE_CACHE else None
+	schedule = scheduler.feedScheduler(constants.URL_GENRE_SOURCE, constants.FEED_SCHEDULE_NAME)
+	stopping = threading.Event()
+	previousHandlers = {}
+	def stop(signalNumber, frame):
+		stopping.set()
+		signal.signal(signalNumber, previousHandlers[signalNumber])
+	if threading.current_thread() is threading.main_thread():
+		for signalNumber in (signal.SIGINT, signal.SIGTERM):
+			previousHandlers[signalNumber] = signal.signal(signalNumber, stop)
+	deadline = threading.Timer(maxSeconds, stopping.set) if maxSeconds is not None else None
+	if deadline is not None:
+		deadline.daemon = True
+		deadline.start()
+	indexLoaded = summaryWritten = time.monotonic()
+	logAndPrintMessage("Daemon started, polling %d RSS Page(s)." % len(schedule.getFeeds()))
+	try:
+		with parseworker.parsePool() as parsers, fetcher.fetchEngine(validators=validators, cache=cache, requestInterval=constants.DAEMON_HOST_REQUEST_INTERVAL, metrics=metrics, stopping=stopping) as engine:
+			bodyCodec = bodystore.bodyStore(conn).getWriteCodec()
+			index = dedup.dedupIndex(db)
+			while not stopping.is_set():
+				now = time.monotonic()
+				dueFeeds = schedule.getDueFeeds()
+				if not dueFeeds:
+					stopping.wait(min(schedule.getSecondsUntilNextPoll(), constants.DAEMON_MAX_SLEEP))
+					continue
+				if now - indexLoaded >= constants.DAEMON_DEDUP_RELOAD_SECONDS:
+					index, indexLoaded = dedup.dedupIndex(db), now
+				metrics.increment('daemon.polls', len(dueFeeds))
+				newsArticles = getNewsArticles( db, dueFeeds, engine, parsers, seen, index, schedule, stopping )
+				retry = processNewsArticles(conn, newsArticles, engine, parsers, seen, bodyCodec, index, stopping)
+				if retry or stopping.is_set():
+					for (url, genre, source) in dueFeeds:
+						validators.forget(url)
+				seen.clearQueued()
+				seen.save()
+				validators.save()
+				schedule.save()
+				if now - summaryWritten >= constants.DAEMON_SUMMARY_SECONDS:
+					writeRunSummary(runName)
+					summaryWritten = now
+				flushLogger()
+	finally:
+		if deadline is not None:
+			deadline.cancel()
+		for signalNumber, handler in previousHandlers.items():
+			signal.signal(signalNumber, handler)
+		seen.save()
+		validators.save()
+		schedule.save()
+		if cache is not None:
+			cache.close()
+		closeDbConnection(db)
+		logAndPrintMessage("Daemon stopped.")
+		writeRunSummary(runName)
+		stopLogger()
 
 def startLogger():
-	"""	Starts the logging of the JapaneseNewsScraper. Creates new text log file based off of the current timestamp. Stores log file in the corresponding Log folder of the application. Sets the writing mode to debugging.	"""
+	"""	Starts the logging of the JapaneseNewsScraper. Creates new text log file based off of the current timestamp, stored in the corresponding Log folder of the application, and also logs to the console.
+	Log records are buffered in memory and written to the file in blocks, or as soon as a warning or error is logged. Returns the name of the run, which the log file and run summary are named by. """
 
-	currentTs = datetime.fromtimestamp(time.time()).strftime('%Y-%m-%d_%H-%M-%S')
+	runName = "JapaneseNewsWebScraper_" + datetime.fromtimestamp(time.time()).strftime('%Y-%m-%d_%H-%M-%S')
 	if not os.path.exists(constants.LOG_DIRECTORY):
 		os.makedirs(constants.LOG_DIRECTORY)
-	fileName = "Logs/JapaneseNewsWebScraper_" + currentTs + ".log" 
-	global logging
-	logging = open(fileName, 'w', encoding='UTF-8')
+	stopLogger()
+	formatter = logging.Formatter('%(asctime)s %(message)s', datefmt='%Y-%m-%d %H:%M:%S')
+	fileHandler = logging.FileHandler(os.path.join(constants.LOG_DIRECTORY, runName + ".log"), 'w', encoding='UTF-8')
+	fileHandler.setFormatter(formatter)
+	consoleHandler = logging.StreamHandler(sys.stdout)
+	consoleHandler.setFormatter(formatter)
+	logger.addHandler(logging.handlers.MemoryHandler(constants.LOG_BUFFER_RECORDS, flushLevel=logging.WARNING, target=fileHandler))
+	logger.addHandler(consoleHandler)
+	logger.setLevel(constants.LOG_LEVEL)
+	logger.propagate = False
 	logAndPrintMessage("Logging initiated for JapaneseNewsWebScraper.")
+	return runName
+
+def stopLogger():
+	""" Writes out any buffered log records and closes the log file. """
+
+	for handler in list(logger.handlers):
+		logger.removeHandler(handler)
+		target = getattr(handler, 'target', None)
+		handler.close()
+		if target is not None:
+			target.close()
+
+def flushLogger():
+	""" Writes out the buffered log records, so that a long-running process does not hold them back. """
+
+	for handler in logger.handlers:
+		handler.flush()
 
 def logAndPrintMessage(message):
-	logging.write(getCurrentTimestamp() + message + '\n')
-	print(getCurrentTimestamp() + message)
-	
-def getCurrentTimestamp():
-	return datetime.fromtimestamp(time.time()).strftime('%Y-%m-%d %H:%M:%S ')		
+	logger.info(message)
+
+def logDebugMessage(message, *args):
+	""" Logs a message of the per-function and per-article detail, formatted with the arguments only if debug logging is on. """
+	logger.debug(message, *args)
+
+def startMetrics():
+	global metrics
+	metrics = instrumentation.runMetrics()
 
-def createDbConnection(database, sqlCreateTable):
-	"""  Establishes a database connection to our Japanese News Database. """
+def writeRunSummary(runName):
+	""" Writes the metrics of the run to a JSON summary beside its log file, adding the rates derived from them, and logs the headline figures. """
 
-	logAndPrintMessage("Entering createDbConnection()...")
+	listed = metrics.getCounter('articles.listed')
+	skipped = metrics.getCounter('dedup.hits') + metrics.getCounter('seen.hits')
+	metrics.setValue('dedup.hitRate', round(skipped / listed, 4) if listed else 0.0)
+	summary = metrics.writeSummary(os.path.join(constants.LOG_DIRECTORY, runName + ".json"))
+	written = summary['counters'].get('articles.success', 0)
+	logAndPrintMessage("Run complete in %.1f seconds: %d article(s) written (%.1f/sec), %d byte(s) downloaded, %.1f%% of listed articles skipped as duplicates." % (summary['seconds'], written,
+		written / summary['seconds'] if summary['seconds'] else 0.0, sum(count for (name, count) in summary['counters'].items() if name.startswith('bytes.')), summary['values']['dedup.hitRate'] * 100))
+
+def createDbConnection(database):
+	"""  Establishes a database connection to our Japanese News Database, creating or migrating its schema to the current version. """
+
+	logDebugMessage("Entering createDbConnection()...")
 	conn = sqlite3.connect(database)
+	storage.applyPragmas(conn)
 	db = conn.cursor()
-	db.execute(sqlCreateTable)
-	logAndPrintMessage("Succesfully created database connection. Exiting createDbConnection().")
+	schema.upgradeSchema(conn, logAndPrintMessage)
+	search.enableSearchIndex(conn)
+	logDebugMessage("Succesfully created database connection. Exiting createDbConnection().")
 	return (conn, db)
 	
-def getNewsArticles(db, urlGenreSource):
-	"""	Retrieves all News Articles for the specified News Source URLs. Using the provided list of URLs, Genres, and Sources, a list of new News Articles is retrieved.	"""
+def untilStopped(items, stopping):
+	""" Yields the items until the stop event, if one is provided, is set. """
+	for item in items:
+		if stopping is not None and stopping.is_set():
+			return
+		yield item
 
-	logAndPrintMessage("Entering getNewsArticles()...")
-	newsArticles = []
-	for (url, genre, source) in urlGenreSource:
+def getNewsArticles(db, urlGenreSource, engine, parsers, seen, index=None, schedule=None, stopping=None):
+	"""	Generates all new News Articles for the specified News Source URLs. Using the provided list of URLs, Genres, and Sources, new News Articles are yielded as each RSS Page arrives. The RSS Pages are fetched concurrently on the fetch engine, no more of them in flight than the engine's window, as the consumer pulls News Articles.
+	A dedup index kept from earlier polls can be provided, and the number of new News Articles on each RSS Page is recorded on the feed schedule if one is provided.
+	Once the stop event, if provided, is set, no further RSS Pages are requested, and RSS Pages that fail because of it are left due on the schedule. """
+
+	logDebugMessage("Entering getNewsArticles()...")
+	retrieved = 0
+	if index is None:
+		index = dedup.dedupIndex(db)
+	indexHits, seenHits = index.getHits(), seen.getHits()
+	getFeedArticles = functools.partial(getRssArticles, engine=engine, parsers=parsers)
+	for (url, genre, source), articlesFuture in engine.imapUnordered(getFeedArticles, untilStopped(urlGenreSource, stopping)):
+		newNewsArticles = []
 		try:
-			newNewsArticles = getNewRssArticles(db, url, genre, source)
-			newsArticles.extend(newNewsArticles)
+			articles = articlesFuture.result()
+			if articles is None:
+				logDebugMessage("RSS Page not modified since the last run for Source: %s, Genre: %s.", source, genre)
+				recordFeedPoll(schedule, url, 0)
+				continue
+			metrics.increment('articles.listed', len(articles))
+			with metrics.timer('dedup'):
+				newNewsArticles = getNewRssArticles(index, seen, articles, genre, source)
+			recordFeedPoll(schedule, url, len(newNewsArticles))
 		except Exception as e:
-			print(e)
-	logAndPrintMessage("Retrieved a total of %d news articles. Exiting getNewsArticles()." % len(newsArticles))
-	return set(newsArticles) # This didn't work; need another method to de-dup the list. Maybe do some list comprehension.
-
-def getNewRssArticles(db, url, genre, source):
-	""" Retrieves all New News Articles for the specified News Source URL. 	Using the provided URL, Genre, and Source, a list of new News Articles is retrieved.  Copies in the database are removed by checking against the database. This is to remove excessive page requests to the website. """
-
-	logAndPrintMessage("Entering getNewRssArticles(). Retrieving Source: " + source + ", Genre: " + genre)
-	page = getUrlPage(url)		
-	getRssArticles = getattr(parser, "get" + source.title() + "RssArticles")
-	articles = getRssArticles(page)
-	newsArticles = processRssArticles(db, articles, genre, source)
-	logAndPrintMessage("Retrieval complete. %d article(s) to process. Exiting getNewRssArticles()." % (len(newsArticles)))
+			if stopping is not None and stopping.is_set():
+				logDebugMessage("Stopped before retrieving RSS Page for Source: %s, Genre: %s.", source, genre)
+				continue
+			logger.warning("Failed to retrieve RSS Page for Source: %s, Genre: %s: %s", source, genre, e)
+			metrics.increment('feeds.failed')
+			recordFeedPoll(schedule, url, None)
+		retrieved += len(newNewsArticles)
+		yield from newNewsArticles
+	indexHits, seenHits = index.getHits() - indexHits, seen.getHits() - seenHits
+	metrics.increment('dedup.hits', indexHits)
+	metrics.increment('seen.hits', seenHits)
+	metrics.increment('articles.new', retrieved)
+	logAndPrintMessage("Retrieved a total of %d news articles, skipping %d duplicate(s) and %d already fetched URL(s). Exiting getNewsArticles()." % (retrieved, indexHits, seenHits))
+
+def recordFeedPoll(schedule, url, newArticles):
+	if schedule is not None:
+		schedule.recordPoll(url, newArticles)
+
+def getRssArticles(urlGenreSource, engine, parsers):
+	""" Retrieves the RSS Page of the specified News Source URL and parses it into a list of News Articles on the parse workers. Runs on the fetch engine's thread pool.
+	Returns None without parsing if the RSS Page has not been modified since the last run. The RSS Page's validators are only stored once it has been parsed. """
+
+	(url, genre, source) = urlGenreSource
+	logDebugMessage("Entering getRssArticles(). Retrieving Source: %s, Genre: %s", source, genre)
+	response = engine.fetchIfModified(url)
+	if response is None:
+		metrics.increment('feeds.notModified')
+		return None
+	(pageBytes, responseHeaders) = response
+	metrics.increment('bytes.' + source, len(pageBytes))
+	with metrics.timer('parse.rss'):
+		articles = newsArticle.fromTuples(parsers.parseRssPage(source, pageBytes))
+	engine.updateValidators(url, responseHeaders)
+	return articles
+
+def getNewRssArticles(index, seen, articles, genre, source):
+	""" Retrieves all New News Articles from the News Articles of a News Source RSS Page. Copies in the database or earlier in the run are removed by checking against the dedup index and the URL seen-store. This is to remove excessive page requests to the website. """
+
+	newsArticles = processRssArticles(index, seen, articles, genre, source)
+	logDebugMessage("Retrieval complete for Source: %s, Genre: %s. %d article(s) to process. Exiting getNewRssArticles().", source, genre, len(newsArticles))
 	return newsArticles
 
-def getUrlPage(url):
-	""" Returns a BeautifulSoup page of the specified URL. 	"""
+def getUrlBytes(url, engine):
+	""" Returns the raw page bytes of the specified URL, or no bytes if the URL could not be read. Connection, DNS, and timeout errors are OSErrors
+	from the pooled connections, and malformed responses are HTTPExceptions; HTTP error statuses raise HTTPError, a URLError and so an OSError too. 	"""
 
-	page = BeautifulSoup()
+	pageBytes = b""
 	try:
-		response = urllib.request.urlopen(url)
-		pageText = str(response.read(), 'UTF-8')
-		page = BeautifulSoup(pageText, "lxml")
-	except urllib.error.URLError:
-		logAndPrintMessage("Unable to read URL: " + url)
-	return page
-
-def processRssArticles(db, articles, genre, source):
-	""" Removes potentially new News Articles that are already in the database. This is to limit which pages we request to process the News Article Body	"""
+		pageBytes = engine.fetch(url)
+	except (OSError, http.client.HTTPException):
+		logger.warning("Unable to read URL: %s", url)
+		metrics.increment('fetch.errors')
+	return pageBytes
+
+def processRssArticles(index, seen, articles, genre, source):
+	""" Removes potentially new News Articles that are already in the database, or whose URL has already been fetched. This is to limit which pages we request to process the News Article Body	"""
 	newsArticles = []
-	for article in articles:
-		if notInDatabase(article, db):
-			article.setGenre(genre)
-			article.setSource(source)
-			newsArticles.append( article )
+	for article in index.filterNew(articles):
+		if seen.isSeen(article.getUrl()):
+			continue
+		seen.markQueued(article.getUrl())
+		article.setGenre(genre)
+		article.setSource(source)
+		newsArticles.append( article )
 	return newsArticles
 
-def notInDatabase(article, db):
-	""" Checks for the existence of current News Article in the database. 	"""
-
-	db.execute(constants.CHECK_FOR_ARTICLE, article.getCheckTuple())
-	matches = db.fetchall()
-	return not matches
+def processNewsArticles(conn, newsArticles, engine, parsers, seen, bodyCodec=None, index=None, stopping=None):
+	""" Retrieves the News Articles bodies concurrently on the fetch engine, and attempts to commit to the database in batches as the bodies arrive. News Articles are pulled from the provided iterable only as body fetches free up. Keeps track of successes and failures.
+	News Articles whose body could not be retrieved are forgotten by the URL seen-store and, if provided, the dedup index they were accepted by, so that a later poll tries them again.
+	Once the stop event, if provided, is set, no further bodies are requested, and the News Articles already retrieved are written.
+	Returns the number of News Articles forgotten to be tried again. """
 
-def processNewsArticles(conn, db, newsArticles):
-	""" Retrieves the News Articles bodies, and attempts to commit to the database. Keeps track of successes and failures.	"""
-
-	logAndPrintMessage("Entering processNewsArticles()...")
+	logDebugMessage("Entering processNewsArticles()...")
 	processed = {'total':0, 'success':0, 'failure':0}
-	for newsArticle in newsArticles:
-		processNewsArticle(conn, db, newsArticle, processed)
-		logAndPrintMessage("Processed %d of %d articles..." % (processed['total'], len(newsArticles)))
+	retry = 0
+	getBody = functools.partial(getNewsArticleBody, engine=engine, parsers=parsers)
+	onWritten = lambda newsArticle: seen.add(newsArticle.getUrl())
+	with storage.batchWriter(conn, processed, logAndPrintMessage, bodyCodec=bodyCodec, metrics=metrics, onWritten=onWritten) as writer:
+		for newsArticle, bodyFuture in engine.imapUnordered(getBody, untilStopped(newsArticles, stopping)):
+			if not processNewsArticle(writer, newsArticle, bodyFuture, processed):
+				seen.unmarkQueued(newsArticle.getUrl())
+				if index is not None:
+					index.discard(newsArticle)
+				retry += 1
+			logDebugMessage("Processed %d articles...", processed['total'])
+	for name in ['total', 'success', 'failure']:
+		metrics.increment('articles.' + name, processed[name])
 	logAndPrintMessage("Finished processing News articles. There were %d successful commit(s) and %d failure(s). Exiting processNewsArticles()." % (processed['success'], processed['failure']))
+	return retry
 
-def processNewsArticle(conn, db, newsArticle, processed):
-	""" Retrieves the News Article body, and attempts to commit to the database. Keeps track of successes and failures. """
+def processNewsArticle(writer, newsArticle, bodyFuture, processed):
+	""" Collects the News Article body from its pending fetch and queues the News Article on the batch writer, which records its URL as fetched once it is written. Keeps track of failures; successes and duplicates are counted by the batch writer once written.
+	Returns whether the News Article was queued. """
 
-	logAndPrintMessage("Entering processNewsArticle() with %s..." % (newsArticle))
+	logDebugMessage("Entering processNewsArticle() with %s...", newsArticle)
 	processed['total'] += 1
+	queued = False
 	try: 
-		newsArticle.setBody( getNewsArticleBody(newsArticle) )
+		newsArticle.setBody( bodyFuture.result() )
 		if newsArticle.getBody() == "":
 			processed['failure'] += 1
-			logAndPrintMessage("Failed to process the Article Body.")
+			logger.warning("Failed to process the Article Body: %s", newsArticle)
 		else:
-			db.execute(constants.INSERT_ARTICLE, newsArticle.getInsertTuple())
-			conn.commit()
-			processed['success'] += 1
-	except sqlite3.IntegrityError:
-		logAndPrintMessage("Article already exists in database: "+ str(newsArticle))
-		processed['failure'] += 1
-	except urllib.error.HTTPError:
-		logAndPrintMessage("Failed to retrieve page for article: "+ str(newsArticle))
-		processed['failure'] += 1
+			writer.add(newsArticle)
+			queued = True
 	except Exception:
-		logAndPrintMessage("Uncaught error occurred: " + str(newsArticle) +' \n' + traceback.format_exc())
+		logger.error("Uncaught error occurred: %s \n%s", newsArticle, traceback.format_exc())
 		processed['failure'] += 1
-	logAndPrintMessage("Exiting processNewsArticle().")
+	logDebugMessage("Exiting processNewsArticle().")
+	return queued
 	
-def getNewsArticleBody(newsArticle):
-	""" Retrieves the News Article body from the News Article's URL.	"""
+def getNewsArticleBody(newsArticle, engine, parsers):
+	""" Retrieves the News Article body from the News Article's URL, parsing the page on the parse workers.	"""
 
-	page = getUrlPage(newsArticle.getUrl())
-	body = ""
-	retrieveNewsArticleBody = getattr(parser, "get" + newsArticle.getSource().title() + "NewsArticleBody")
-	body = retrieveNewsArticleBody(page)
+	pageBytes = getUrlBytes(newsArticle.getUrl(), engine)
+	metrics.increment('bytes.' + newsArticle.getSource(), len(pageBytes))
+	with metrics.timer('parse.body'):
+		body = parsers.parseNewsArticleBody(newsArticle.getSource(), pageBytes)
 	return body	
 	
-def getNewsArticleImgUrl(newsArticle):
-	page = getUrlPage(newsArticle.getUrl())
+def getNewsArticleImgUrl(newsArticle, engine):
+	page = parser.getPage(getUrlBytes(newsArticle.getUrl(), engine))
 	imgUrl = ""
 	imgUrl = GET_IMG_URL[newsArticle.getSource()](page, newsArticle) # <- Need to update from pageText to page in further function calls
 	return imgUrl	
@@ -155,10 +357,9 @@ def getNewsArticleImgUrl(newsArticle):
 def closeDbConnection(db):
 	""" Closes the database connection.  """
 
-	logAndPrintMessage("Entering closeDbConnection()...")
+	logDebugMessage("Entering closeDbConnection()...")
 	db.close()
-	logAndPrintMessage("Database closed. Exiting closeDbConnection().")
-	logging.close()
+	logDebugMessage("Database closed. Exiting closeDbConnection().")
 	
 
 
@@ -166,4 +367,16 @@ def closeDbConnection(db):
 # Beginning of the program
 ###################################################  
 if __name__ == '__main__':
-	scrapeNews()
+	argumentParser = argparse.ArgumentParser(description="Scrapes the Japanese News Sources into the Japanese News Database.")
+	argumentParser.add_argument('--replay', action='store_true', help="parse the cached responses of earlier runs again, without network requests")
+	argumentParser.add_argument('--daemon', action='store_true', help="keep running, polling each RSS Page on its own adaptive interval")
+	argumentParser.add_argument('--seconds', type=float, default=None, help="stop the daemon after this many seconds")
+	argumentParser.add_argument('--database', default=None, help="database to replay into, %s by default" % constants.REPLAY_DATABASE_NAME)
+	argumentParser.add_argument('--cache', default=None, help="response cache directory, %s by default" % constants.RESPONSE_CACHE_DIRECTORY)
+	options = argumentParser.parse_args()
+	if options.replay:
+		replayNews(options.database, options.cache)
+	elif options.daemon:
+		runDaemon(options.seconds)
+	else:
+		scrapeNews()
@@ -0,0 +1,755 @@
+################################################
+# Description: Benchmarks for the JapaneseNewsScraper. Pages are served from local stub HTTP servers with a configurable
+# latency, so that the scraper can be timed without making requests to the live News Source websites. The News Source
+# pages in Fixtures/ are synthetic, written to the markup the parsers expect rather than recorded from the websites (see
+# Fixtures/README.md), so the parse, micro, scrape, and replay figures compare code on known markup, not on the live sites.
+# Usage: python JapaneseNewsScraperBenchmark.py <benchmark> [options]
+
+import argparse, http.server, threading, time, hashlib, tempfile, os, shutil, sqlite3, tracemalloc, warnings, random, datetime, statistics, re, contextlib, resource, json
+import JapaneseNewsScraperFetcher as fetcher, JapaneseNewsScraperDatabase as storage
+import JapaneseNewsScraperParser as parser, JapaneseNewsScraperLxmlParser as lxmlparser, JapaneseNewsScraperParseWorker as parseworker
+import JapaneseNewsScraperTextSegmenter as segmenter, JapaneseNewsScraperSearch as search, JapaneseNewsScraperSchema as schema
+import JapaneseNewsScraperBodyStore as bodystore, JapaneseNewsScraperResponseCache as responsecache, JapaneseNewsScraperScheduler as scheduler
+from concurrent.futures import ThreadPoolExecutor
+import JapaneseNewsScraperConstants as constants
+from JapaneseNewsArticle import newsArticle, getArticleHash
+
+SOURCES = ['NHK', 'Asahi', 'Yomiuri']
+FIXTURE_DIRECTORY = 'Fixtures'
+# (News Source, page kind, fixture file) of the synthetic News Source pages
+FIXTURES = [('NHK', 'RssArticles', 'nhk_rss.xml'), ('Asahi', 'RssArticles', 'asahi_rss.rdf'), ('Yomiuri', 'RssArticles', 'yomiuri_list.html'),
+	('NHK', 'NewsArticleBody', 'nhk_article.html'), ('Asahi', 'NewsArticleBody', 'asahi_article.html'), ('Yomiuri', 'NewsArticleBody', 'yomiuri_article.html')]
+PARSERS = {'soup': parser, 'lxml': lxmlparser}
+# (RSS Page fixture, News Article fixture, News Article URL prefix, text preceding each Title, pattern of the News Article URLs) of each News Source's stub site
+FIXTURE_SITES = {'NHK': ('nhk_rss.xml', 'nhk_article.html', 'http://www3.nhk.or.jp/news/html/', '<item>\n<title>', r'<guid>(.*?)</guid>'),
+	'Asahi': ('asahi_rss.rdf', 'asahi_article.html', 'http://www.asahi.com/articles/', '">\n<title>', r'<link>(.*?)</link>'),
+	'Yomiuri': ('yomiuri_list.html', 'yomiuri_article.html', 'http://www.yomiuri.co.jp/', '<span class="headline">', r'href="(.*?)"')}
+# Sample PubDatetimes as each News Source publishes them
+PUB_DATETIMES = {'NHK': 'Wed, 04 May 2016 21:52:33 +0900', 'Asahi': '2016-05-04T10:53:19+09:00', 'Yomiuri': '（2016年05月04日）'}
+GENRES = ['Society', 'Politics', 'Economics', 'International', 'Sports', 'Culture/Entertainment', 'Science/Medicine']
+
+class stubServer:
+	def __init__(self, pages, latency=0.0):
+		self.__pages = pages
+		self.__latency = latency
+		self.__requests = 0
+		self.__connections = 0
+		self.__bytesSent = 0
+		self.__lock = threading.Lock()
+		self.__server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), self.makeRequestHandler())
+		self.__server.daemon_threads = True
+		self.__thread = threading.Thread(target=self.__server.serve_forever, daemon=True)
+	def __enter__(self):
+		self.start()
+		return self
+	def __exit__(self, excType, excValue, excTraceback):
+		self.stop()
+	def start(self):
+		self.__thread.start()
+	def stop(self):
+		self.__server.shutdown()
+		self.__server.server_close()
+	def getBaseUrl(self):
+		return "http://127.0.0.1:%d" % self.__server.server_address[1]
+	def getUrls(self):
+		return [self.getBaseUrl() + path for path in self.__pages]
+	def getRequests(self):
+		return self.__requests
+	def getConnections(self):
+		return self.__connections
+	def getBytesSent(self):
+		return self.__bytesSent
+	def setPage(self, path, body):
+		self.__pages[path] = body
+	def makeRequestHandler(self):
+		""" Returns a request handler class serving this stub server's pages over keep-alive HTTP/1.1. """
+		stub = self
+		class requestHandler(http.server.BaseHTTPRequestHandler):
+			protocol_version = 'HTTP/1.1'
+			disable_nagle_algorithm = True
+			def setup(self):
+				stub.countConnection()
+				http.server.BaseHTTPRequestHandler.setup(self)
+			def do_GET(self):
+				stub.handleRequest(self)
+			def log_message(self, format, *args):
+				pass
+		return requestHandler
+	def countConnection(self):
+		with self.__lock:
+			self.__connections += 1
+	def handleRequest(self, handler):
+		""" Waits for the configured latency, and then responds with the requested page. Answers 304 when the request's If-None-Match matches the page's ETag. """
+		with self.__lock:
+			self.__requests += 1
+		time.sleep(self.__latency)
+		body = self.__pages.get(handler.path)
+		if body is None:
+			handler.send_response(404)
+			handler.send_header('Content-Length', '0')
+			handler.end_headers()
+			return
+		etag = '"%s"' % hashlib.sha1(body).hexdigest()
+		if handler.headers.get('If-None-Match') == etag:
+			handler.send_response(304)
+			handler.send_header('ETag', etag)
+			handler.end_headers()
+			return
+		handler.send_response(200)
+		handler.send_header('Content-Type', 'text/html; charset=UTF-8')
+		handler.send_header('Content-Length', str(len(body)))
+		handler.send_header('ETag', etag)
+		handler.end_headers()
+		handler.wfile.write(body)
+		with self.__lock:
+			self.__bytesSent += len(body)
+
+def makeSyntheticPages(count, size):
+	""" Returns a dictionary of count synthetic pages of roughly size bytes each, keyed by path. """
+	filler = ("<p>" + "日本のニュース記事の本文。" * 8 + "</p>\n").encode('UTF-8')
+	body = b"<html><body>" + filler * max(1, size // len(filler)) + b"</body></html>"
+	return {"/page%05d.html" % i: body for i in range(count)}
+
+def startSourceServers(pagesPerSource, pageSize, latency):
+	""" Starts one stub server per News Source, so that the per-host limits of the fetch engine apply as they would live. """
+	servers = [stubServer(makeSyntheticPages(pagesPerSource, pageSize), latency) for source in SOURCES]
+	for server in servers:
+		server.start()
+	return servers
+
+def copyDatabase(upgrade=True):
+	""" Returns the path of a scratch copy of the Japanese News Database, so that benchmarks never write to the real one.
+	The copy is migrated to the current schema unless upgrade is False. """
+	path = os.path.join(tempfile.mkdtemp(), constants.DATABASE_NAME)
+	shutil.copyfile(constants.DATABASE_NAME, path)
+	if upgrade:
+		conn = sqlite3.connect(path)
+		schema.upgradeSchema(conn, lambda message: None)
+		conn.close()
+	return path
+
+def makeSyntheticArticles(count, prefix):
+	""" Returns count new News Articles with bodies copied from the Japanese News Database and unique titles. """
+	conn = sqlite3.connect(constants.DATABASE_NAME)
+	rows = conn.execute("SELECT TITLE, BODY, URL, PUBDATETIME, GENRE, SOURCE FROM ARTICLES").fetchall()
+	conn.close()
+	articles = []
+	for i in range(count):
+		title, body, url, pubDatetime, genre, source = rows[i % len(rows)]
+		article = newsArticle("%s %s-%d" % (title, prefix, i), pubDatetime, "%s?benchmark=%s-%d" % (url, prefix, i))
+		article.setBody(body)
+		article.setGenre(genre)
+		article.setSource(source)
+		articles.append(article)
+	return articles
+
+def readFixture(fileName):
+	with open(os.path.join(FIXTURE_DIRECTORY, fileName), 'rb') as fixtureFile:
+		return fixtureFile.read()
+
+def timeCall(function, repeat):
+	""" Returns the mean seconds per call of the function over repeat calls. """
+	startTime = time.perf_counter()
+	for i in range(repeat):
+		function()
+	return (time.perf_counter() - startTime) / repeat
+
+def measurePeakMemory(function):
+	""" Returns the peak Python heap allocation, in bytes, of a single call of the function. lxml's own C allocations are not counted. """
+	tracemalloc.start()
+	function()
+	current, peak = tracemalloc.get_traced_memory()
+	tracemalloc.stop()
+	return peak
+
+def getSegmentedArticles():
+	""" Returns the words of the Title and Body of each News Article in the Japanese News Database. """
+	conn = sqlite3.connect(constants.DATABASE_NAME)
+	rows = conn.execute("SELECT TITLE, BODY FROM ARTICLES").fetchall()
+	conn.close()
+	return [(segmenter.segmenter.tokenize(title), segmenter.segmenter.tokenize(body)) for (title, body) in rows]
+
+def makeSyntheticRows(count, segmentedArticles, seed=1):
+	""" Generates count synthetic ARTICLES rows, each mixing the words of three real News Articles, paired with the segmented Title and Body for the search index. """
+	randomizer = random.Random(seed)
+	startDatetime = datetime.datetime(2012, 1, 1)
+	for i in range(count):
+		words = [word for (title, body) in randomizer.sample(segmentedArticles, 3) for word in body]
+		titleWords = randomizer.choice(segmentedArticles)[0]
+		bodyWords = words[randomizer.randrange(max(1, len(words) - 80)):][:80]
+		pubDatetime = startDatetime + datetime.timedelta(seconds=randomizer.randrange(5 * 365 * 86400))
+		title, body = ("".join(titleWords) + " #%d" % i, "".join(bodyWords))
+		row = (title, body, "http://example.com/%d.html" % i, str(pubDatetime), randomizer.choice(GENRES), randomizer.choice(SOURCES), None, getArticleHash(title, pubDatetime, body))
+		yield (row, " ".join(segmenter.trimNonWords(titleWords)), " ".join(segmenter.trimNonWords(bodyWords)))
+
+def makeSyntheticDatabase(path, count, withSearchIndex=False):
+	""" Creates a database of count synthetic News Articles, bulk loading the search index alongside when requested. """
+	segmentedArticles = getSegmentedArticles()
+	conn = sqlite3.connect(path)
+	storage.applyPragmas(conn)
+	schema.upgradeSchema(conn, lambda message: None)
+	if withSearchIndex:
+		conn.execute(constants.CREATE_INDEX_STATE)
+		conn.execute(constants.CREATE_SEARCH_INDEX)
+	rows = makeSyntheticRows(count, segmentedArticles)
+	rowid = 0
+	while True:
+		chunk = [next(rows, None) for i in range(10000)]
+		chunk = [entry for entry in chunk if entry is not None]
+		if not chunk:
+			break
+		with conn:
+			conn.executemany(constants.INSERT_ARTICLE, [row for (row, title, body) in chunk])
+			if withSearchIndex:
+				conn.executemany(constants.INSERT_SEARCH_INDEX, [(rowid + i + 1, title, body) for i, (row, title, body) in enumerate(chunk)])
+		rowid += len(chunk)
+	if withSearchIndex:
+		with conn:
+			conn.execute(constants.UPDATE_INDEX_STATE, (constants.SEARCH_INDEX_NAME, rowid))
+	return conn
+
+def makeFixtureSite(baseUrl, feeds, sources=None):
+	""" Returns the pages of a stub site of feeds copies of the RSS Page fixtures, taking the News Sources in turn, each copy with its own Titles and
+	URLs and every News Article page the News Source's article fixture, along with the (URL, Genre, Source) of each feed. Scales to thousands of feeds. """
+	sources = sources or SOURCES
+	pages, urlGenreSource = {}, []
+	for feed in range(feeds):
+		source = sources[feed % len(sources)]
+		rssFixture, articleFixture, urlPrefix, titleMarker, urlPattern = FIXTURE_SITES[source]
+		page = readFixture(rssFixture).decode('UTF-8').replace(urlPrefix, '%s/feed%d/' % (baseUrl, feed)).replace(titleMarker, titleMarker + '[%d] ' % feed)
+		pages['/feed%d%s' % (feed, os.path.splitext(rssFixture)[1])] = page.encode('UTF-8')
+		articlePage = readFixture(articleFixture)
+		for url in re.findall(urlPattern, page):
+			if url.startswith(baseUrl + '/feed%d/' % feed):
+				pages[url[len(baseUrl):]] = articlePage
+		urlGenreSource.append((baseUrl + '/feed%d%s' % (feed, os.path.splitext(rssFixture)[1]), GENRES[feed % len(GENRES)], source))
+	return (pages, urlGenreSource)
+
+@contextlib.contextmanager
+def scraperSandbox(urlGenreSource, **settings):
+	""" Runs the scraper in a scratch directory against the specified feeds, with its output silenced and the specified constants overridden. """
+	import JapaneseNewsScraper as scraper
+	directory, savedSettings = os.getcwd(), {name: getattr(constants, name) for name in ['URL_GENRE_SOURCE'] + list(settings)}
+	settings['URL_GENRE_SOURCE'] = urlGenreSource
+	for name, value in settings.items():
+		setattr(constants, name, value)
+	os.chdir(tempfile.mkdtemp())
+	try:
+		with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+			yield scraper
+	finally:
+		os.chdir(directory)
+		for name, value in savedSettings.items():
+			setattr(constants, name, value)
+
+def interleave(lists):
+	""" Interleaves the provided lists, mimicking the mixed order of the URLs of a scrape. """
+	return [item for group in zip(*lists) for item in group]
+
+
+################# Benchmarks ######################################
+def benchmarkFetch(options):
+	""" Times fetching the pages of three stub News Sources with a range of global and per-host concurrency settings. """
+	servers = startSourceServers(options.pages // len(SOURCES), options.size, options.latency)
+	urls = interleave([server.getUrls() for server in servers])
+	print("Fetching %d pages of ~%d bytes from %d stub hosts with %.0f ms latency." % (len(urls), options.size, len(servers), options.latency * 1000))
+	print("%8s %9s %10s %10s" % ("workers", "per-host", "seconds", "pages/sec"))
+	try:
+		for workers, perHost in [(1, 1), (4, 2), (8, 2), (8, 4), (16, 4), (16, 8)]:
+			with fetcher.fetchEngine(workers=workers, hostConcurrency={}, defaultHostConcurrency=perHost) as engine:
+				startTime = time.perf_counter()
+				for url, future in engine.imapUnordered(engine.fetch, urls):
+					future.result()
+				elapsed = time.perf_counter() - startTime
+			print("%8d %9d %10.2f %10.1f" % (workers, perHost, elapsed, len(urls) / elapsed))
+	finally:
+		for server in servers:
+			server.stop()
+
+def benchmarkRevalidate(options):
+	""" Times fetching the pages of three stub News Sources as RSS Pages twice, first without and then with stored validators. """
+	servers = startSourceServers(options.pages // len(SOURCES), options.size, options.latency)
+	urls = interleave([server.getUrls() for server in servers])
+	validators = fetcher.validatorStore(os.path.join(tempfile.mkdtemp(), 'validators.json'))
+	print("Fetching %d RSS Pages of ~%d bytes from %d stub hosts with %.0f ms latency." % (len(urls), options.size, len(servers), options.latency * 1000))
+	print("%6s %10s %12s %13s %12s" % ("run", "seconds", "modified", "connections", "bytes sent"))
+	try:
+		for run in ['cold', 'warm']:
+			connections = sum(server.getConnections() for server in servers)
+			bytesSent = sum(server.getBytesSent() for server in servers)
+			with fetcher.fetchEngine(validators=validators, hostConcurrency={}) as engine:
+				startTime = time.perf_counter()
+				modified = 0
+				for url, future in engine.imapUnordered(engine.fetchIfModified, urls):
+					if future.result() is not None:
+						engine.updateValidators(url, future.result()[1])
+						modified += 1
+				elapsed = time.perf_counter() - startTime
+			validators.save()
+			connections = sum(server.getConnections() for server in servers) - connections
+			bytesSent = sum(server.getBytesSent() for server in servers) - bytesSent
+			print("%6s %10.2f %12d %13d %12d" % (run, elapsed, modified, connections, bytesSent))
+	finally:
+		for server in servers:
+			server.stop()
+
+def benchmarkInsert(options):
+	""" Times inserting News Articles into copies of the Japanese News Database, committing per News Article as before, and in batches on WAL. """
+	print("Inserting %d News Articles into a copy of %s, with %d duplicates." % (options.articles, constants.DATABASE_NAME, options.articles // 10))
+	print("%-28s %10s %12s %9s %9s" % ("mode", "seconds", "inserts/sec", "success", "failure"))
+	for mode, batchSize in [('commit per article', None), ('batch of 10 (WAL)', 10), ('batch of 50 (WAL)', 50), ('batch of 500 (WAL)', 500)]:
+		articles = makeSyntheticArticles(options.articles, mode.split(' ')[0] + str(batchSize))
+		articles += articles[:len(articles) // 10]
+		conn = sqlite3.connect(copyDatabase())
+		processed = {'total':len(articles), 'success':0, 'failure':0}
+		startTime = time.perf_counter()
+		if batchSize is None:
+			for article in articles:
+				try:
+					conn.execute(constants.INSERT_ARTICLE, article.getInsertTuple())
+					conn.commit()
+					processed['success'] += 1
+				except sqlite3.IntegrityError:
+					processed['failure'] += 1
+		else:
+			storage.applyPragmas(conn)
+			with storage.batchWriter(conn, processed, lambda message: None, batchSize=batchSize) as writer:
+				for article in articles:
+					writer.add(article)
+		elapsed = time.perf_counter() - startTime
+		conn.close()
+		print("%-28s %10.2f %12.1f %9d %9d" % (mode, elapsed, len(articles) / elapsed, processed['success'], processed['failure']))
+
+def benchmarkParse(options):
+	""" Times parsing the synthetic fixture pages with each parser backend, page bytes to extracted News Articles or body. """
+	warnings.filterwarnings('ignore', message='It looks like you.re using an HTML parser')
+	print("Parsing each synthetic fixture page %d times (see Fixtures/README.md)." % options.repeat)
+	print("%-8s %-16s %-8s %12s %14s %10s" % ("source", "page", "backend", "ms/page", "peak heap KB", "result"))
+	for source, kind, fileName in FIXTURES:
+		pageBytes = readFixture(fileName)
+		for backend, backendParser in PARSERS.items():
+			parse = getattr(backendParser, "get" + source.title() + kind)
+			function = lambda: parse(backendParser.getPage(pageBytes))
+			try:
+				result = function()
+			except Exception as e:
+				print("%-8s %-16s %-8s %12s %14s %10s" % (source, kind, backend, "-", "-", type(e).__name__))
+				continue
+			elapsed = timeCall(function, options.repeat)
+			peak = measurePeakMemory(function)
+			print("%-8s %-16s %-8s %12.3f %14.1f %10s" % (source, kind, backend, elapsed * 1000, peak / 1024, len(result)))
+
+def benchmarkParseWorkers(options):
+	""" Times parsing a corpus of fixture News Article pages on parse pools of increasing size, fed by fetch threads as in a scrape. """
+	warnings.filterwarnings('ignore', message='It looks like you.re using an HTML parser')
+	constants.PARSER_BACKEND = {source: options.backend for source in SOURCES}
+	fixtures = [(source, readFixture(fileName)) for (source, kind, fileName) in FIXTURES if kind == 'NewsArticleBody']
+	corpus = [fixtures[i % len(fixtures)] for i in range(options.pages)]
+	workerCounts = sorted({0, 1, 2, 4, os.cpu_count() or 1})
+	print("Parsing %d News Article pages with the %s backend on %d CPU(s), from %d fetch threads." % (len(corpus), options.backend, os.cpu_count() or 1, constants.FETCH_WORKERS))
+	print("%8s %10s %11s" % ("workers", "seconds", "pages/sec"))
+	for workers in workerCounts:
+		with parseworker.parsePool(workers) as parsers, ThreadPoolExecutor(constants.FETCH_WORKERS) as threads:
+			list(threads.map(lambda page: parsers.parseNewsArticleBody(*page), corpus[:max(1, workers) * 4]))
+			startTime = time.perf_counter()
+			list(threads.map(lambda page: parsers.parseNewsArticleBody(*page), corpus))
+			elapsed = time.perf_counter() - startTime
+		print("%8d %10.2f %11.1f" % (workers, elapsed, len(corpus) / elapsed))
+
+def timeLikeScan(conn, query, filters):
+	""" Times finding every News Article matching the query and filters with LIKE on the Body, as was needed before the search index. """
+	conditions = ["BODY LIKE ?" for word in query.split(' ')]
+	parameters = ['%' + word + '%' for word in query.split(' ')]
+	for (key, condition) in [('source', "SOURCE = ?"), ('genre', "GENRE = ?"), ('startDatetime', "PUBDATETIME >= ?"), ('endDatetime', "PUBDATETIME <= ?")]:
+		if key in filters:
+			conditions.append(condition)
+			parameters.append(filters[key])
+	startTime = time.perf_counter()
+	matches = conn.execute("SELECT TITLE FROM ARTICLES WHERE " + " AND ".join(conditions), parameters).fetchall()
+	return (time.perf_counter() - startTime, len(matches))
+
+def benchmarkSearch(options):
+	""" Times search queries against the FTS5 index of a synthetic corpus, with and without filters, against a LIKE scan of the Bodies. """
+	path = os.path.join(tempfile.mkdtemp(), 'search.db')
+	print("Building a synthetic corpus of %d News Articles..." % options.rows)
+	startTime = time.perf_counter()
+	conn = makeSyntheticDatabase(path, options.rows, withSearchIndex=True)
+	enableStartTime = time.perf_counter()
+	search.enableSearchIndex(conn)
+	print("Built in %.1f s (%.1f MB). Enabling the search index on it took %.3f s." % (enableStartTime - startTime, os.path.getsize(path) / 1e6, time.perf_counter() - enableStartTime))
+	queries = [("地震", {}), ("熊本 地震", {}), ("選挙", {'source': 'NHK'}), ("地震", {'source': 'Yomiuri', 'genre': 'Society'}),
+		("首相", {'startDatetime': '2016-01-01', 'endDatetime': '2016-06-30 23:59:59'}), ("熊本 避難", {'source': 'NHK', 'startDatetime': '2015-01-01', 'endDatetime': '2015-12-31 23:59:59'})]
+	print("%-10s %-38s %9s %9s %10s %12s" % ("query", "filters", "p50 ms", "p95 ms", "LIKE ms", "LIKE matches"))
+	for query, filters in queries:
+		timings = []
+		for i in range(options.repeat):
+			startTime = time.perf_counter()
+			search.searchArticles(conn, query, limit=20, **filters)
+			timings.append(time.perf_counter() - startTime)
+		timings.sort()
+		likeElapsed, likeMatches = timeLikeScan(conn, query, filters)
+		filterText = " ".join(str(filters[key]) for key in ['source', 'genre'] if key in filters)
+		if 'startDatetime' in filters:
+			filterText += " %s..%s" % (filters['startDatetime'], filters['endDatetime'][:10])
+		print("%-10s %-38s %9.2f %9.2f %10.1f %12d" % (query, filterText.strip() or "-", statistics.median(timings) * 1000, timings[int(len(timings) * 0.95) - 1] * 1000, likeElapsed * 1000, likeMatches))
+	conn.close()
+
+def createSchemaDatabase(path, version):
+	""" Creates an empty database with the version 1 schema, as it was before versioning, or the current schema. """
+	conn = sqlite3.connect(path)
+	storage.applyPragmas(conn)
+	if version == 1:
+		conn.execute(constants.CREATE_TABLE_V1)
+	else:
+		schema.upgradeSchema(conn, lambda message: None)
+	return conn
+
+def benchmarkSchema(options):
+	""" Compares the version 1 schema, keyed on the whole Body, with the current one: migration time, inserts, de-duplication lookups, and size. """
+	path = copyDatabase(upgrade=False)
+	sizeBefore = os.path.getsize(path)
+	conn = sqlite3.connect(path)
+	startTime = time.perf_counter()
+	schema.upgradeSchema(conn, lambda message: None)
+	elapsed = time.perf_counter() - startTime
+	rows = conn.execute("SELECT COUNT(*) FROM ARTICLES").fetchone()[0]
+	conn.close()
+	print("Migrated a copy of %s (%d News Articles) to version %d in %.2f seconds, %d -> %d bytes." % (constants.DATABASE_NAME, rows, constants.SCHEMA_VERSION, elapsed, sizeBefore, os.path.getsize(path)))
+	print("Inserting %d synthetic News Articles in batches of %d, then looking up %d (Title, PubDatetime) keys." % (options.articles, constants.WRITE_BATCH_SIZE, options.repeat))
+	print("%-8s %12s %14s %12s %14s" % ("schema", "inserts/sec", "lookup (ms)", "bytes", "bytes/article"))
+	syntheticRows = [row for (row, title, body) in makeSyntheticRows(options.articles, getSegmentedArticles())]
+	keys = [(row[0], row[3]) for row in random.Random(2).sample(syntheticRows, min(options.repeat, len(syntheticRows)))]
+	for version, sqlInsert, width in [(1, constants.INSERT_ARTICLE_V1, 7), (constants.SCHEMA_VERSION, constants.INSERT_ARTICLE, 8)]:
+		path = os.path.join(tempfile.mkdtemp(), "SCHEMA_V%d.db" % version)
+		conn = createSchemaDatabase(path, version)
+		startTime = time.perf_counter()
+		for i in range(0, len(syntheticRows), constants.WRITE_BATCH_SIZE):
+			with conn:
+				conn.executemany(sqlInsert, [row[:width] for row in syntheticRows[i:i + constants.WRITE_BATCH_SIZE]])
+		insertElapsed = time.perf_counter() - startTime
+		lookupElapsed = timeCall(lambda: [conn.execute("SELECT 1 FROM ARTICLES WHERE TITLE = ? AND PUBDATETIME = ?", key).fetchone() for key in keys], 1) / max(1, len(keys))
+		conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+		conn.close()
+		size = os.path.getsize(path)
+		print("%-8s %12.1f %14.3f %12d %14.1f" % ("v%d" % version, len(syntheticRows) / insertElapsed, lookupElapsed * 1000, size, size / max(1, len(syntheticRows))))
+
+def benchmarkBodies(options):
+	""" Compares storing bodies as TEXT with zlib compressed BLOBs, with and without a trained dictionary: size, inserts, and scans. """
+	conn = sqlite3.connect(constants.DATABASE_NAME)
+	bodies = [body for (body,) in conn.execute("SELECT BODY FROM ARTICLES ORDER BY rowid")]
+	conn.close()
+	heldOut = bodies[len(bodies) // 2:]
+	rawSize = sum(len(body.encode('UTF-8')) for body in heldOut)
+	dictionaryCodec = bodystore.bodyCodec(1, bodystore.trainDictionary(bodies[:len(bodies) // 2]))
+	print("Compressing the %d newest bodies (%d bytes) with a dictionary trained on the older ones:" % (len(heldOut), rawSize))
+	for name, codec in [('zlib', bodystore.bodyCodec()), ('zlib + dictionary', dictionaryCodec)]:
+		compressedSize = sum(len(codec.compress(body)) for body in heldOut)
+		print("  %-20s %9d bytes, %5.1f%% of TEXT" % (name, compressedSize, compressedSize * 100.0 / rawSize))
+	print("Converting a copy of %s, inserting %d News Articles in batches of %d, and scanning every body %d times." % (constants.DATABASE_NAME, options.articles, constants.WRITE_BATCH_SIZE, options.repeat))
+	print("%-20s %11s %12s %12s %14s %14s" % ("storage", "convert (s)", "inserts/sec", "bytes", "body rows/sec", "title rows/sec"))
+	for name in ['TEXT', 'zlib', 'zlib + dictionary']:
+		conn = sqlite3.connect(copyDatabase())
+		storage.applyPragmas(conn)
+		store = bodystore.bodyStore(conn)
+		codec = {'TEXT': None, 'zlib': store.getLatestCodec(), 'zlib + dictionary': None}[name]
+		startTime = time.perf_counter()
+		if name == 'zlib + dictionary':
+			codec = store.trainDictionary()
+		if codec is not None:
+			store.convertBodies(codec)
+		convertElapsed = time.perf_counter() - startTime
+		articles = makeSyntheticArticles(options.articles, name)
+		processed = {'total':len(articles), 'success':0, 'failure':0}
+		startTime = time.perf_counter()
+		with storage.batchWriter(conn, processed, lambda message: None, bodyCodec=codec) as writer:
+			for article in articles:
+				writer.add(article)
+		insertElapsed = time.perf_counter() - startTime
+		conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+		conn.execute("VACUUM")
+		size = os.path.getsize(conn.execute("PRAGMA database_list").fetchone()[2])
+		rows = conn.execute("SELECT COUNT(*) FROM ARTICLES").fetchone()[0]
+		scanElapsed = timeCall(lambda: sum(len(article.getBody()) for article in store.readArticles()), options.repeat)
+		titlesElapsed = timeCall(lambda: sum(len(article.getTitle()) for article in store.readArticles()), options.repeat)
+		conn.close()
+		print("%-20s %11.2f %12.1f %12d %14.1f %14.1f" % (name, convertElapsed, len(articles) / insertElapsed, size, rows / scanElapsed, rows / titlesElapsed))
+
+class dictNewsArticle:
+	""" The News Article model as it was before it had slots, value equality, and cached tuples, kept for comparison. """
+	def __init__(self, title, pubDatetime, url):
+		self.__title = title
+		self.__pubDatetime = pubDatetime
+		self.__url = url
+		self.__body = None
+		self.__genre = None
+		self.__source = None
+		self.__imgUrl = None
+	def getPubDatetime(self):
+		return str(self.__pubDatetime)
+	def setBody(self, body):
+		self.__body = body
+	def setGenre(self, genre):
+		self.__genre = genre
+	def setSource(self, source):
+		self.__source = source
+	def getInsertTuple(self):
+		return (self.__title, self.__body, self.__url, self.__pubDatetime, self.__genre, self.__source, self.__imgUrl, getArticleHash(self.__title, self.__pubDatetime, self.__body))
+	def getCheckTuple(self):
+		return (self.__title, self.__pubDatetime)
+
+def benchmarkArticles(options):
+	""" Compares the slotted News Article model with the previous dict based one: memory, construction, and the per-article calls of a scrape. """
+	count = options.articles
+	startDatetime = datetime.datetime(2016, 5, 1)
+	titlePubdateUrl = [("記事の見出し %d" % i, startDatetime + datetime.timedelta(seconds=i), "http://www3.nhk.or.jp/news/html/20160501/k%011d.html" % (i % (count - count // 10))) for i in range(count)]
+	print("%d News Articles, of which %d repeat an earlier URL." % (count, count // 10))
+	print("%-26s %12s %14s %12s %12s %14s %10s" % ("model", "bytes/article", "construct (ms)", "pubdate (ms)", "check (ms)", "insert x2 (ms)", "set size"))
+	constructors = [('dict based', lambda: [dictNewsArticle(title, pubdate, url) for (title, pubdate, url) in titlePubdateUrl]),
+		('slots', lambda: [newsArticle(title, pubdate, url) for (title, pubdate, url) in titlePubdateUrl]),
+		('slots, fromTuples', lambda: newsArticle.fromTuples(titlePubdateUrl, 'Society', 'NHK'))]
+	for name, construct in constructors:
+		articles = construct()
+		del articles
+		tracemalloc.start()
+		articles = construct()
+		size = tracemalloc.get_traced_memory()[0]
+		tracemalloc.stop()
+		constructElapsed = timeCall(construct, 1)
+		for article in articles:
+			article.setBody("本文")
+			article.setGenre('Society')
+			article.setSource('NHK')
+		pubdateElapsed = timeCall(lambda: [article.getPubDatetime() for article in articles for i in range(3)], 1)
+		checkElapsed = timeCall(lambda: [article.getCheckTuple() for article in articles for i in range(3)], 1)
+		insertElapsed = timeCall(lambda: [article.getInsertTuple() for article in articles for i in range(2)], 1)
+		print("%-26s %12.1f %14.1f %12.1f %12.1f %14.1f %10d" % (name, size / count, constructElapsed * 1000, pubdateElapsed * 1000, checkElapsed * 1000, insertElapsed * 1000, len(set(articles))))
+
+def benchmarkReplay(options):
+	""" Times a scrape of a stub NHK site with the response cache on, a replay of it from the cache with the site gone, and the cache's eviction. """
+	server = stubServer({}, options.latency)
+	server.start()
+	pages, urlGenreSource = makeFixtureSite(server.getBaseUrl(), options.pages)
+	for path, body in pages.items():
+		server.setPage(path, body)
+	print("Scraping %d fixture feeds with %.0f ms latency, then replaying them from the response cache." % (options.pages, options.latency * 1000))
+	print("%-8s %10s %10s %14s %10s" % ("run", "seconds", "articles", "articles/sec", "requests"))
+	with scraperSandbox(urlGenreSource, RESPONSE_CACHE=True) as scraper:
+		startTime = time.perf_counter()
+		scraper.scrapeNews()
+		scrapeElapsed = time.perf_counter() - startTime
+		server.stop()
+		requests = server.getRequests()
+		scraped = sqlite3.connect(constants.DATABASE_NAME).execute("SELECT COUNT(*) FROM ARTICLES").fetchone()[0]
+		startTime = time.perf_counter()
+		scraper.replayNews()
+		replayElapsed = time.perf_counter() - startTime
+		replayed = sqlite3.connect(constants.REPLAY_DATABASE_NAME).execute("SELECT COUNT(*) FROM ARTICLES").fetchone()[0]
+		cacheSize = responsecache.responseCache().getSize()
+	print("%-8s %10.2f %10d %14.1f %10d" % ("scrape", scrapeElapsed, scraped, scraped / scrapeElapsed, requests))
+	print("%-8s %10.2f %10d %14.1f %10d" % ("replay", replayElapsed, replayed, replayed / replayElapsed, 0))
+	print("Response cache: %d bytes for %d responses, the News Article pages stored once by content." % (cacheSize, len(pages)))
+	maxBytes = options.size * 100
+	with responsecache.responseCache(tempfile.mkdtemp(), maxBytes) as cache:
+		bodies = [os.urandom(options.size) for i in range(options.articles)]
+		elapsed = timeCall(lambda: [cache.put("http://example.com/%d.html" % i, body) for i, body in enumerate(bodies)], 1)
+		print("Stored %d responses of %d bytes in %.2f seconds (%.1f/sec) into a cache bounded at %d bytes: %d bytes, %d responses kept." % (len(bodies), options.size, elapsed, len(bodies) / elapsed, maxBytes, cache.getSize(),
+			sum(1 for i in range(len(bodies)) if cache.getVersions("http://example.com/%d.html" % i))))
+
+def benchmarkLogging(options):
+	""" Times the per-article log lines of a scrape, written and printed one at a time with a fresh timestamp as before, and through the
+	buffered logger at the default and debug levels, along with the cost of the per-stage timers. """
+	articles = makeSyntheticArticles(options.articles, 'logging')
+	print("Logging the 3 per-article lines of %d News Articles." % len(articles))
+	print("%-32s %10s %16s" % ("logging", "seconds", "us/article"))
+	with scraperSandbox([]) as scraper:
+		def logUnbuffered():
+			with open(os.path.join(tempfile.mkdtemp(), "unbuffered.log"), 'w', encoding='UTF-8') as logFile:
+				for i, article in enumerate(articles):
+					for message in ["Entering processNewsArticle() with %s..." % article, "Exiting processNewsArticle().", "Processed %d articles..." % i]:
+						timestamp = datetime.datetime.fromtimestamp(time.time()).strftime('%Y-%m-%d %H:%M:%S ')
+						logFile.write(timestamp + message + '\n')
+						print(timestamp + message)
+		def logBuffered():
+			for i, article in enumerate(articles):
+				scraper.logDebugMessage("Entering processNewsArticle() with %s...", article)
+				scraper.logDebugMessage("Exiting processNewsArticle().")
+				scraper.logDebugMessage("Processed %d articles...", i)
+		def timeStages():
+			for article in articles:
+				with scraper.metrics.timer('fetch.NHK'):
+					pass
+				scraper.metrics.increment('bytes.NHK', 1000)
+		results = [('unbuffered, every line', timeCall(logUnbuffered, 1))]
+		for level in ['INFO', 'DEBUG']:
+			constants.LOG_LEVEL = level
+			scraper.startLogger()
+			results.append(("buffered logger, %s level" % level, timeCall(logBuffered, 1)))
+			scraper.stopLogger()
+		constants.LOG_LEVEL = 'INFO'
+		results.append(('per-stage timer and counter', timeCall(timeStages, 1)))
+	for name, elapsed in results:
+		print("%-32s %10.3f %16.2f" % (name, elapsed, elapsed * 1e6 / len(articles)))
+
+def makeFeedArrivals(ratesPerHour, seconds, seed=1):
+	""" Returns, for each feed, the sorted publication times of its News Articles over the period, arriving at random at the feed's hourly rate. """
+	randomizer = random.Random(seed)
+	arrivals = []
+	for rate in ratesPerHour:
+		times, now = [], randomizer.expovariate(rate / 3600.0)
+		while now < seconds:
+			times.append(now)
+			now += randomizer.expovariate(rate / 3600.0)
+		arrivals.append(times)
+	return arrivals
+
+def simulatePolling(arrivals, seconds, nextPoll, recordPoll, window=20):
+	""" Simulates polling feeds that list only their latest window News Articles. nextPoll returns the time and feed of the next poll, and recordPoll
+	is told the new News Articles each poll found. Returns the number of polls, the News Articles found and missed, and the mean delay in finding them. """
+	polls, found, missed, delays = 0, 0, 0, 0.0
+	lastSeen = [0] * len(arrivals)
+	while True:
+		now, feed = nextPoll()
+		if now >= seconds:
+			break
+		published = lastSeen[feed]
+		while published < len(arrivals[feed]) and arrivals[feed][published] <= now:
+			published += 1
+		new = arrivals[feed][max(lastSeen[feed], published - window):published]
+		missed += published - lastSeen[feed] - len(new)
+		found += len(new)
+		delays += sum(now - arrival for arrival in new)
+		lastSeen[feed] = published
+		polls += 1
+		recordPoll(feed, len(new))
+	return (polls, found, missed, delays / max(1, found))
+
+def benchmarkDaemon(options):
+	""" Simulates a day of polling feeds of widely different update rates, as cron runs of every feed at a fixed interval and as the adaptive scheduler. """
+	ratesPerHour = [60, 40, 20, 12, 12, 6, 6, 4, 3, 3, 2, 2, 1, 1, 1, 0.5, 0.5, 0.25, 0.25, 0.1, 0.1, 0.05, 0.05, 0.04, 0.04]
+	seconds = 24 * 3600
+	arrivals = makeFeedArrivals(ratesPerHour, seconds)
+	print("Simulating %d feeds publishing %d News Articles over a day, each feed listing its latest 20." % (len(ratesPerHour), sum(len(times) for times in arrivals)))
+	print("%-24s %8s %8s %8s %14s" % ("polling", "polls", "found", "missed", "mean delay (s)"))
+	for interval in [300, 900, 3600]:
+		polls = iter((start, feed) for start in range(0, seconds + interval, interval) for feed in range(len(ratesPerHour)))
+		result = simulatePolling(arrivals, seconds, lambda: next(polls), lambda feed, new: None)
+		print("%-24s %8d %8d %8d %14.1f" % ("cron every %d min" % (interval // 60), result[0], result[1], result[2], result[3]))
+	clock = [0.0]
+	urls = ["http://example.com/feed%d.xml" % feed for feed in range(len(ratesPerHour))]
+	schedule = scheduler.feedScheduler([(url, 'Society', 'NHK') for url in urls], randomizer=random.Random(2), clock=lambda: clock[0])
+	def nextAdaptivePoll():
+		feed = min(schedule.getFeeds(), key=lambda feed: feed.getNextPoll())
+		clock[0] = max(clock[0], feed.getNextPoll())
+		return (clock[0], urls.index(feed.getUrl()))
+	result = simulatePolling(arrivals, seconds, nextAdaptivePoll, lambda feed, new: schedule.recordPoll(urls[feed], new))
+	print("%-24s %8d %8d %8d %14.1f" % ("adaptive", result[0], result[1], result[2], result[3]))
+	print("Adaptive intervals learned (s): " + ", ".join("%g/h:%d" % (rate, feed.getInterval()) for rate, feed in zip(ratesPerHour, schedule.getFeeds())))
+
+def benchmarkMicro(options):
+	""" Times each parse function of the News Sources on the fixtures, parseText, and the database insert path, one call at a time.
+	Returns the mean milliseconds per call of each, by name. """
+	warnings.filterwarnings('ignore', message='It looks like you.re using an HTML parser')
+	results = {}
+	for source in SOURCES:
+		function = getattr(parser, "parse" + source.title() + "PubDate")
+		results["parse%sPubDate" % source.title()] = timeCall(lambda: function(PUB_DATETIMES[source]), options.repeat * 100)
+	bodies = []
+	for source, kind, fileName in FIXTURES:
+		pageBytes = readFixture(fileName)
+		for backend, backendParser in PARSERS.items():
+			parse = getattr(backendParser, "get" + source.title() + kind)
+			function = lambda: parse(backendParser.getPage(pageBytes))
+			try:
+				result = function()
+			except Exception:
+				continue
+			if kind == 'NewsArticleBody' and backend == 'lxml':
+				bodies.append(result)
+			results["%s get%s%s" % (backend, source.title(), kind)] = timeCall(function, options.repeat)
+	for source, body in zip(SOURCES, bodies):
+		results["parseText %s body" % source] = timeCall(lambda: segmenter.parseText(body), options.repeat)
+	articles = makeSyntheticArticles(options.articles, 'micro')
+	conn = sqlite3.connect(copyDatabase())
+	storage.applyPragmas(conn)
+	processed = {'total':len(articles), 'success':0, 'failure':0}
+	def insertArticles():
+		with storage.batchWriter(conn, processed, lambda message: None) as writer:
+			for article in articles:
+				writer.add(article)
+	results["insert article (batched)"] = timeCall(insertArticles, 1) / len(articles)
+	conn.close()
+	results = {name: seconds * 1000 for (name, seconds) in results.items()}
+	print("%-36s %12s" % ("function", "ms/call"))
+	for name, milliseconds in results.items():
+		print("%-36s %12.4f" % (name, milliseconds))
+	return results
+
+def benchmarkScrape(options):
+	""" Runs scrapeNews end to end against a stub site of fixture feeds for all News Sources, reporting articles per second and peak resident memory.
+	Returns the figures by name. """
+	server = stubServer({}, options.latency)
+	server.start()
+	pages, urlGenreSource = makeFixtureSite(server.getBaseUrl(), options.pages)
+	for path, body in pages.items():
+		server.setPage(path, body)
+	print("Scraping %d fixture feeds (%d pages) with %.0f ms latency." % (len(urlGenreSource), len(pages), options.latency * 1000))
+	try:
+		with scraperSandbox(urlGenreSource) as scraper:
+			startTime = time.perf_counter()
+			scraper.scrapeNews()
+			elapsed = time.perf_counter() - startTime
+			articles = sqlite3.connect(constants.DATABASE_NAME).execute("SELECT COUNT(*) FROM ARTICLES").fetchone()[0]
+	finally:
+		server.stop()
+	results = {'seconds': elapsed, 'articles': articles, 'articles/sec': articles / elapsed, 'requests': server.getRequests(),
+		'peak RSS MB': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0, 'peak worker RSS MB': resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024.0}
+	for name, value in results.items():
+		print("%-20s %12.1f" % (name, value))
+	return results
+
+def benchmarkSuite(options):
+	""" Runs the end-to-end scrape and the microbenchmarks, writes their figures to the output file as JSON if one is given, and compares them with a
+	baseline written by an earlier run, flagging each figure that has regressed by more than 10%. """
+	results = {}
+	for name in ['scrape', 'micro']:
+		print("== %s ==" % name)
+		results.update({"%s: %s" % (name, key): value for (key, value) in BENCHMARKS[name](options).items()})
+	if options.output:
+		with open(options.output, 'w', encoding='UTF-8') as outputFile:
+			json.dump(results, outputFile, indent=1, ensure_ascii=False)
+	if options.baseline:
+		with open(options.baseline, 'r', encoding='UTF-8') as baselineFile:
+			baseline = json.load(baselineFile)
+		print("== compared with %s ==" % options.baseline)
+		print("%-46s %12s %12s %9s" % ("figure", "baseline", "now", "change"))
+		for name, value in results.items():
+			if not baseline.get(name):
+				continue
+			change = (value - baseline[name]) * 100.0 / baseline[name]
+			higherIsBetter = name.endswith('/sec') or name.endswith(': articles')
+			regressed = -change > 10 if higherIsBetter else change > 10
+			print("%-46s %12.4f %12.4f %+8.1f%%%s" % (name, baseline[name], value, change, "  REGRESSED" if regressed else ""))
+
+BENCHMARKS = {'fetch': benchmarkFetch, 'revalidate': benchmarkRevalidate, 'insert': benchmarkInsert, 'parse': benchmarkParse, 'parseworkers': benchmarkParseWorkers, 'search': benchmarkSearch, 'schema': benchmarkSchema, 'bodies': benchmarkBodies, 'articles': benchmarkArticles, 'replay': benchmarkReplay, 'logging': benchmarkLogging, 'daemon': benchmarkDaemon, 'micro': benchmarkMicro, 'scrape': benchmarkScrape, 'suite': benchmarkSuite}
+
+def parseArguments():
+	argumentParser = argparse.ArgumentParser(description="Benchmarks for the JapaneseNewsScraper.")
+	argumentParser.add_argument('benchmark', choices=sorted(BENCHMARKS))
+	argumentParser.add_argument('--pages', type=int, default=150, help="number of pages to fetch")
+	argumentParser.add_argument('--size', type=int, default=20000, help="approximate page size in bytes")
+	argumentParser.add_argument('--latency', type=float, default=0.05, help="stub server latency in seconds")
+	argumentParser.add_argument('--articles', type=int, default=2000, help="number of News Articles to insert")
+	argumentParser.add_argument('--repeat', type=int, default=50, help="number of times to repeat each timed call")
+	argumentParser.add_argument('--rows', type=int, default=1000000, help="number of News Articles in the synthetic corpus")
+	argumentParser.add_argument('--backend', choices=sorted(PARSERS), default='soup', help="parser backend for the parse worker benchmark")
+	argumentParser.add_argument('--output', help="file to write the suite's figures to, as JSON")
+	argumentParser.add_argument('--baseline', help="figures written by an earlier suite run to compare with")
+	return argumentParser.parse_args()
+
+
+###################################################
+# Beginning of the program
+###################################################
+if __name__ == '__main__':
+	options = parseArguments()
+	BENCHMARKS[options.benchmark](options)
@@ -0,0 +1,147 @@
+################################################
+# Description: Compressed body storage for the JapaneseNewsScraper. When enabled, News Article bodies are stored in
+# ARTICLES.BODY as zlib compressed BLOBs instead of UTF-8 TEXT, compressed against a preset dictionary trained on the
+# bodies already in the database. Each BLOB starts with the id of its dictionary, so TEXT and BLOB bodies, and bodies
+# compressed against different dictionaries, can live side by side. Bodies read through readArticles are decompressed
+# only when getBody is called, and SQL readers see the text through the BODY_TEXT() function.
+# Usage: python JapaneseNewsScraperBodyStore.py [--database JAPAN_NEWS.db] [--train] [--decompress]
+
+import sqlite3, zlib, struct, argparse
+import JapaneseNewsScraperConstants as constants, JapaneseNewsScraperSchema as schema
+from JapaneseNewsArticle import newsArticle
+
+class bodyCodec:
+	HEADER = struct.Struct('<H')
+	def __init__(self, dictionaryId=0, dictionary=None, level=None):
+		self.__dictionaryId = dictionaryId
+		self.__dictionary = dictionary or None
+		self.__level = constants.BODY_COMPRESSION_LEVEL if level is None else level
+	def getDictionaryId(self):
+		return self.__dictionaryId
+	def getDictionary(self):
+		return self.__dictionary
+	def compress(self, body):
+		""" Returns the body compressed as a raw deflate stream, prefixed with the id of the dictionary it was compressed against. """
+		if self.__dictionary:
+			compressor = zlib.compressobj(self.__level, zlib.DEFLATED, -zlib.MAX_WBITS, zdict=self.__dictionary)
+		else:
+			compressor = zlib.compressobj(self.__level, zlib.DEFLATED, -zlib.MAX_WBITS)
+		return self.HEADER.pack(self.__dictionaryId) + compressor.compress(body.encode('UTF-8')) + compressor.flush()
+	def decompress(self, data):
+		if self.__dictionary:
+			decompressor = zlib.decompressobj(-zlib.MAX_WBITS, zdict=self.__dictionary)
+		else:
+			decompressor = zlib.decompressobj(-zlib.MAX_WBITS)
+		return (decompressor.decompress(memoryview(data)[self.HEADER.size:]) + decompressor.flush()).decode('UTF-8')
+
+def trainDictionary(bodies, size=None):
+	""" Returns a preset dictionary for the bodies: the most recent bodies concatenated, oldest first, up to size bytes.
+	zlib matches against the end of the dictionary most cheaply, and whole recent bodies carry the boilerplate, names, and phrasing
+	that the next bodies repeat, which compressed smaller than dictionaries of frequent n-grams or sentences. """
+	size = size or constants.BODY_DICTIONARY_SIZE
+	samples, total = [], 0
+	for body in reversed(bodies):
+		sample = body.encode('UTF-8')
+		samples.append(sample)
+		total += len(sample)
+		if total >= size:
+			break
+	return b"".join(reversed(samples))[-size:]
+
+class bodyStore:
+	""" The stored bodies of a database connection. Registers the BODY_TEXT() SQL function on the connection. """
+	def __init__(self, conn):
+		self.__conn = conn
+		self.__conn.execute(constants.CREATE_BODY_DICTIONARIES)
+		self.__codecs = {0: bodyCodec()}
+		self.loadDictionaries()
+		self.__conn.create_function('BODY_TEXT', 1, self.decodeBody, deterministic=True)
+	def loadDictionaries(self):
+		for (dictionaryId, dictionary) in self.__conn.execute(constants.SELECT_BODY_DICTIONARIES):
+			self.__codecs[dictionaryId] = bodyCodec(dictionaryId, dictionary)
+	def getCodec(self, dictionaryId):
+		""" Returns the codec of the dictionary, reloading the dictionaries if it was trained through another bodyStore. """
+		if dictionaryId not in self.__codecs:
+			self.loadDictionaries()
+		return self.__codecs[dictionaryId]
+	def getLatestCodec(self):
+		return self.__codecs[max(self.__codecs)]
+	def getWriteCodec(self):
+		""" Returns the codec that new bodies are written with, or None when bodies are stored as TEXT.
+		A dictionary is trained on the first use, once the database holds enough bodies to train it on. """
+		if not constants.BODY_COMPRESSION:
+			return None
+		if len(self.__codecs) == 1:
+			self.trainDictionary()
+		return self.getLatestCodec()
+	def trainDictionary(self):
+		""" Trains and stores a new dictionary on the most recent bodies in the database. Returns its codec, or the latest codec
+		if there are too few bodies to train on. """
+		rows = self.__conn.execute(constants.SELECT_RECENT_BODIES, (constants.BODY_DICTIONARY_SAMPLES,)).fetchall()
+		bodies = [self.decodeBody(body) for (body,) in reversed(rows)]
+		if len(bodies) < constants.BODY_DICTIONARY_MIN_SAMPLES:
+			return self.getLatestCodec()
+		dictionary = trainDictionary(bodies)
+		with self.__conn:
+			dictionaryId = self.__conn.execute(constants.INSERT_BODY_DICTIONARY, (dictionary,)).lastrowid
+		self.__codecs[dictionaryId] = bodyCodec(dictionaryId, dictionary)
+		return self.__codecs[dictionaryId]
+	def decodeBody(self, body):
+		""" Returns the text of a stored body, decompressing it if it is a compressed BLOB. """
+		if isinstance(body, bytes):
+			return self.getCodec(bodyCodec.HEADER.unpack_from(body)[0]).decompress(body)
+		return body
+	def readArticles(self, where="", parameters=()):
+		""" Yields the News Articles of the ARTICLES rows matching the optional WHERE clause. Compressed bodies are only decompressed
+		when getBody is first called on their News Article. """
+		for (title, pubDatetime, url, body, genre, source, imgUrl) in self.__conn.execute(constants.SELECT_ARTICLES + where, parameters):
+			article = newsArticle(title, pubDatetime, url)
+			if isinstance(body, bytes):
+				article.setCompressedBody(body, self.getCodec(bodyCodec.HEADER.unpack_from(body)[0]))
+			else:
+				article.setBody(body)
+			article.setGenre(genre)
+			article.setSource(source)
+			article.setImgUrl(imgUrl)
+			yield article
+	def convertBodies(self, codec, chunkSize=None):
+		""" Rewrites every stored body with the codec, or as TEXT when the codec is None, in chunks of one transaction each,
+		and then reclaims the freed space. Returns the number of bodies rewritten. """
+		chunkSize = chunkSize or constants.BODY_CONVERT_CHUNK_SIZE
+		lastRowid, converted = 0, 0
+		while True:
+			rows = self.__conn.execute(constants.SELECT_BODIES_TO_CONVERT, (lastRowid, chunkSize)).fetchall()
+			if not rows:
+				break
+			lastRowid = rows[-1][0]
+			updates = []
+			for (rowid, body) in rows:
+				text = self.decodeBody(body)
+				stored = codec.compress(text) if codec is not None else text
+				if stored != body:
+					updates.append((stored, rowid))
+			with self.__conn:
+				self.__conn.executemany(constants.UPDATE_BODY, updates)
+			converted += len(updates)
+		self.__conn.execute("VACUUM")
+		return converted
+
+
+###################################################
+# Beginning of the program
+###################################################
+if __name__ == '__main__':
+	argumentParser = argparse.ArgumentParser(description="Converts the stored News Article bodies to compressed BLOBs, or back to TEXT.")
+	argumentParser.add_argument('--database', default=constants.DATABASE_NAME)
+	argumentParser.add_argument('--train', action='store_true', help="train a new dictionary on the current bodies before converting")
+	argumentParser.add_argument('--decompress', action='store_true', help="store every body as TEXT again")
+	argumentParser.add_argument('--chunk-size', type=int, default=None, help="number of News Articles per transaction")
+	options = argumentParser.parse_args()
+	conn = sqlite3.connect(options.database)
+	schema.upgradeSchema(conn)
+	bodies = bodyStore(conn)
+	codec = None
+	if not options.decompress:
+		codec = bodies.trainDictionary() if options.train or bodies.getLatestCodec().getDictionaryId() == 0 else bodies.getLatestCodec()
+	print("Converted %d News Article bod(ies)." % bodies.convertBodies(codec, options.chunk_size))
+	conn.close()
@@ -1,11 +1,79 @@
 URL_GENRE_SOURCE = [("http://www3.nhk.or.jp/rss/news/cat1.xml", "Society", "NHK"), ("http://www3.nhk.or.jp/rss/news/cat2.xml", "Culture/Entertainment", "NHK"), ("http://www3.nhk.or.jp/rss/news/cat3.xml", "Science/Medicine", "NHK"), ("http://www3.nhk.or.jp/rss/news/cat4.xml", "Politics", "NHK"), ("http://www3.nhk.or.jp/rss/news/cat5.xml", "Economics", "NHK"), ("http://www3.nhk.or.jp/rss/news/cat6.xml", "International", "NHK"), ("http://www3.nhk.or.jp/rss/news/cat7.xml", "Sports", "NHK"), ("http://www3.asahi.com/rss/national.rdf", "Society", "Asahi"), ("http://www3.asahi.com/rss/politics.rdf", "Politics", "Asahi"), ("http://www3.asahi.com/rss/sports.rdf", "Sports", "Asahi"), ("http://www3.asahi.com/rss/business.rdf", "Economics", "Asahi"), ("http://www3.asahi.com/rss/international.rdf", "International", "Asahi"), ("http://www3.asahi.com/rss/culture.rdf", "Culture/Entertainment", "Asahi"), ("http://www.yomiuri.co.jp/politics/?from=ygnav2", "Politics", "Yomiuri"), ("http://www.yomiuri.co.jp/national/?from=ygnav2", "Society", "Yomiuri"), ("http://www.yomiuri.co.jp/economy/?from=ygnav2", "Economics", "Yomiuri"), ("http://www.yomiuri.co.jp/sports/?from=ygnav2", "Sports", "Yomiuri"), ("http://www.yomiuri.co.jp/world/?from=ygnav2", "International", "Yomiuri"), ("http://www.yomiuri.co.jp/local/?from=ygnav2", "Local", "Yomiuri"), ("http://www.yomiuri.co.jp/science/?from=ygnav2", "Science/Medicine", "Yomiuri"), ("http://www.yomiuri.co.jp/eco/?from=ygnav2", "Environment", "Yomiuri"), ("http://www.yomiuri.co.jp/culture/?from=ygnav2", "Culture/Entertainment", "Yomiuri"), ("http://www.yomiuri.co.jp/komachi/?from=ygnav2", "Komachi", "Yomiuri"), ("http://www.yomiuri.co.jp/life/travel/?from=ygnav2", "Travel", "Yomiuri"), ("http://www.yomiuri.co.jp/life/animal/?from=ygnav2", "Animals", "Yomiuri") ]
 LOG_DIRECTORY = "Logs"
+# Level of the log file and console: 'DEBUG' also logs each function entry and exit and each News Article
+LOG_LEVEL = 'INFO'
+# Log records are buffered and written to the log file this many at a time, or at once for a warning or error
+LOG_BUFFER_RECORDS = 500
+# Upper bounds, in milliseconds, of the latency histogram buckets in the run summary
+METRICS_LATENCY_BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+# Number of timings sampled per timer for the percentiles of the run summary, so a long-running daemon keeps a bounded sample
+METRICS_RESERVOIR_SIZE = 1024
 
 ########### SQLite Queries ######################
-CREATE_TABLE = "CREATE TABLE IF NOT EXISTS ARTICLES(TITLE TEXT NOT NULL, BODY TEXT NOT NULL, URL TEXT NOT NULL, PUBDATETIME DATE NOT NULL, GENRE TEXT NOT NULL, SOURCE TEXT NOT NULL, IMAGE_URL TEXT, PRIMARY KEY(TITLE, PUBDATETIME, BODY))"
-CHECK_FOR_ARTICLE = "SELECT * FROM ARTICLES WHERE TITLE = ? AND PUBDATETIME = ?"
-INSERT_ARTICLE = "INSERT INTO ARTICLES VALUES (?,?,?,?,?,?,?)"  
+SCHEMA_VERSION = 2
+CREATE_TABLE = "CREATE TABLE IF NOT EXISTS ARTICLES(ARTICLE_ID INTEGER PRIMARY KEY, TITLE TEXT NOT NULL, BODY TEXT NOT NULL, URL TEXT NOT NULL, PUBDATETIME DATE NOT NULL, GENRE TEXT NOT NULL, SOURCE TEXT NOT NULL, IMAGE_URL TEXT, ARTICLE_HASH BLOB NOT NULL UNIQUE)"
+CREATE_INDEXES = ["CREATE INDEX IF NOT EXISTS ARTICLES_PUBDATETIME_TITLE ON ARTICLES(PUBDATETIME, TITLE)",
+	"CREATE INDEX IF NOT EXISTS ARTICLES_TITLE_PUBDATETIME ON ARTICLES(TITLE, PUBDATETIME)",
+	"CREATE INDEX IF NOT EXISTS ARTICLES_SOURCE_GENRE_PUBDATETIME ON ARTICLES(SOURCE, GENRE, PUBDATETIME)",
+	"CREATE INDEX IF NOT EXISTS ARTICLES_URL ON ARTICLES(URL)"]
+# Version 1 schema, keyed on the whole Body; kept to migrate existing databases and to benchmark against
+CREATE_TABLE_V1 = "CREATE TABLE IF NOT EXISTS ARTICLES(TITLE TEXT NOT NULL, BODY TEXT NOT NULL, URL TEXT NOT NULL, PUBDATETIME DATE NOT NULL, GENRE TEXT NOT NULL, SOURCE TEXT NOT NULL, IMAGE_URL TEXT, PRIMARY KEY(TITLE, PUBDATETIME, BODY))"
+INSERT_ARTICLE_V1 = "INSERT INTO ARTICLES VALUES (?,?,?,?,?,?,?)"
+MIGRATE_ARTICLES_V2 = ["CREATE TABLE ARTICLES_V2(ARTICLE_ID INTEGER PRIMARY KEY, TITLE TEXT NOT NULL, BODY TEXT NOT NULL, URL TEXT NOT NULL, PUBDATETIME DATE NOT NULL, GENRE TEXT NOT NULL, SOURCE TEXT NOT NULL, IMAGE_URL TEXT, ARTICLE_HASH BLOB NOT NULL UNIQUE)",
+	"INSERT INTO ARTICLES_V2 SELECT rowid, TITLE, BODY, URL, PUBDATETIME, GENRE, SOURCE, IMAGE_URL, ARTICLE_HASH(TITLE, PUBDATETIME, BODY) FROM ARTICLES ORDER BY rowid",
+	"DROP TABLE ARTICLES",
+	"ALTER TABLE ARTICLES_V2 RENAME TO ARTICLES"]
+LOAD_RECENT_ARTICLE_KEYS = "SELECT TITLE, PUBDATETIME FROM ARTICLES WHERE PUBDATETIME >= ?"
+CHECK_FOR_ARTICLES = "SELECT TITLE, PUBDATETIME FROM ARTICLES WHERE TITLE IN (%s)"
+SELECT_ARTICLE_URLS = "SELECT URL FROM ARTICLES"
+CREATE_SEEN_URLS = "CREATE TABLE IF NOT EXISTS SEEN_URLS(URL TEXT PRIMARY KEY) WITHOUT ROWID"
+COUNT_SEEN_URLS = "SELECT COUNT(*) FROM SEEN_URLS"
+SELECT_SEEN_URLS = "SELECT URL FROM SEEN_URLS"
+CHECK_SEEN_URL = "SELECT 1 FROM SEEN_URLS WHERE URL = ?"
+INSERT_SEEN_URL = "INSERT OR IGNORE INTO SEEN_URLS VALUES (?)"
+CREATE_INDEX_STATE = "CREATE TABLE IF NOT EXISTS INDEX_STATE(NAME TEXT PRIMARY KEY, LAST_ROWID INTEGER NOT NULL)"
+CREATE_VOCABULARY_TABLES = [CREATE_INDEX_STATE,
+	"CREATE TABLE IF NOT EXISTS WORD_INDEX(WORD TEXT NOT NULL, ARTICLE_ROWID INTEGER NOT NULL, FREQUENCY INTEGER NOT NULL, PRIMARY KEY(WORD, ARTICLE_ROWID)) WITHOUT ROWID",
+	"CREATE TABLE IF NOT EXISTS VOCABULARY(WORD TEXT PRIMARY KEY, FREQUENCY INTEGER NOT NULL, DOCUMENTS INTEGER NOT NULL) WITHOUT ROWID"]
+SELECT_INDEX_STATE = "SELECT LAST_ROWID FROM INDEX_STATE WHERE NAME = ?"
+UPDATE_INDEX_STATE = "INSERT OR REPLACE INTO INDEX_STATE VALUES (?,?)"
+SELECT_ARTICLES_TO_INDEX = "SELECT rowid, TITLE, BODY_TEXT(BODY) FROM ARTICLES WHERE rowid > ? ORDER BY rowid LIMIT ?"
+INSERT_WORD_INDEX = "INSERT OR REPLACE INTO WORD_INDEX(WORD, ARTICLE_ROWID, FREQUENCY) VALUES (?,?,?)"
+COUNT_UNKNOWN_INDEX_WORDS = "SELECT COUNT(*) FROM WORD_INDEX WHERE WORD NOT IN (SELECT WORD FROM VOCABULARY)"
+UPSERT_VOCABULARY = "INSERT INTO VOCABULARY VALUES (?,?,?) ON CONFLICT(WORD) DO UPDATE SET FREQUENCY = FREQUENCY + excluded.FREQUENCY, DOCUMENTS = DOCUMENTS + excluded.DOCUMENTS"
+CREATE_SEARCH_INDEX = "CREATE VIRTUAL TABLE IF NOT EXISTS ARTICLES_FTS USING fts5(TITLE, BODY, content='', tokenize='unicode61')"
+CREATE_SEARCH_INDEX_TRIGGER = "CREATE TEMP TRIGGER IF NOT EXISTS ARTICLES_FTS_INSERT AFTER INSERT ON main.ARTICLES BEGIN INSERT INTO ARTICLES_FTS(rowid, TITLE, BODY) VALUES (new.rowid, SEGMENT(new.TITLE), SEGMENT(BODY_TEXT(new.BODY))); INSERT OR REPLACE INTO INDEX_STATE VALUES ('%s', new.rowid); END"
+INSERT_SEARCH_INDEX = "INSERT INTO ARTICLES_FTS(rowid, TITLE, BODY) VALUES (?,?,?)"
+SEARCH_ARTICLES = "SELECT ARTICLES.TITLE, ARTICLES.URL, ARTICLES.PUBDATETIME, ARTICLES.GENRE, ARTICLES.SOURCE FROM ARTICLES_FTS JOIN ARTICLES ON ARTICLES.rowid = ARTICLES_FTS.rowid WHERE ARTICLES_FTS MATCH ?%s ORDER BY ARTICLES_FTS.rank LIMIT ?"
+CREATE_BODY_DICTIONARIES = "CREATE TABLE IF NOT EXISTS BODY_DICTIONARIES(DICTIONARY_ID INTEGER PRIMARY KEY, DICTIONARY BLOB NOT NULL)"
+SELECT_BODY_DICTIONARIES = "SELECT DICTIONARY_ID, DICTIONARY FROM BODY_DICTIONARIES"
+INSERT_BODY_DICTIONARY = "INSERT INTO BODY_DICTIONARIES(DICTIONARY) VALUES (?)"
+SELECT_RECENT_BODIES = "SELECT BODY FROM ARTICLES ORDER BY rowid DESC LIMIT ?"
+SELECT_ARTICLES = "SELECT TITLE, PUBDATETIME, URL, BODY, GENRE, SOURCE, IMAGE_URL FROM ARTICLES"
+SELECT_BODIES_TO_CONVERT = "SELECT rowid, BODY FROM ARTICLES WHERE rowid > ? ORDER BY rowid LIMIT ?"
+UPDATE_BODY = "UPDATE ARTICLES SET BODY = ? WHERE rowid = ?"
+CREATE_RESPONSE_CACHE_TABLES = ["CREATE TABLE IF NOT EXISTS RESPONSES(URL TEXT NOT NULL, DIGEST TEXT NOT NULL, FETCHED REAL NOT NULL, PRIMARY KEY(URL, DIGEST)) WITHOUT ROWID",
+	"CREATE TABLE IF NOT EXISTS OBJECTS(DIGEST TEXT PRIMARY KEY, SIZE INTEGER NOT NULL, LAST_ACCESS REAL NOT NULL) WITHOUT ROWID",
+	"CREATE INDEX IF NOT EXISTS OBJECTS_LAST_ACCESS ON OBJECTS(LAST_ACCESS)"]
+SUM_RESPONSE_CACHE_SIZE = "SELECT COALESCE(SUM(SIZE), 0) FROM OBJECTS"
+INSERT_RESPONSE = "INSERT OR REPLACE INTO RESPONSES VALUES (?,?,?)"
+INSERT_RESPONSE_OBJECT = "INSERT OR IGNORE INTO OBJECTS VALUES (?,?,?)"
+TOUCH_RESPONSE_OBJECT = "UPDATE OBJECTS SET LAST_ACCESS = ? WHERE DIGEST = ?"
+SELECT_RESPONSE_VERSIONS = "SELECT DIGEST FROM RESPONSES WHERE URL = ? ORDER BY FETCHED"
+SELECT_LEAST_RECENT_OBJECTS = "SELECT DIGEST, SIZE FROM OBJECTS ORDER BY LAST_ACCESS LIMIT ?"
+DELETE_RESPONSES = "DELETE FROM RESPONSES WHERE DIGEST = ?"
+DELETE_RESPONSE_OBJECT = "DELETE FROM OBJECTS WHERE DIGEST = ?"
+INSERT_ARTICLE = "INSERT INTO ARTICLES(TITLE, BODY, URL, PUBDATETIME, GENRE, SOURCE, IMAGE_URL, ARTICLE_HASH) VALUES (?,?,?,?,?,?,?,?)"
 DATABASE_NAME = 'JAPAN_NEWS.db'
+DATABASE_PRAGMAS = ['PRAGMA journal_mode = WAL', 'PRAGMA synchronous = NORMAL', 'PRAGMA temp_store = MEMORY', 'PRAGMA cache_size = -16000', 'PRAGMA busy_timeout = 5000']
+WRITE_BATCH_SIZE = 50
+WRITE_BATCH_SECONDS = 5
+DEDUP_WINDOW_DAYS = 14
+DEDUP_QUERY_BATCH_SIZE = 500
+SEEN_URL_BLOOM_NAME = 'SEEN_URLS.bloom'
+SEEN_URL_CAPACITY = 100000
+SEEN_URL_ERROR_RATE = 0.001
+TRACKING_PARAMETERS = {'from', 'ref', 'cid', 'fm', 'rss'}
 
 ########## NHK News Variables ##########################
 NHK_TAG = {'title': 'title', 'url': 'guid', 'pubdate':'pubdate'} 
@@ -20,3 +88,72 @@ ASAHI_IMAGE_URL_REGEXP = r'(<div class="Image">)([\n\r]*.*[\n\r]*src=")(.*)(" />
 ASAHI_PUB_DATETIME_LENGTH = 25
 ASAHI_PUB_INFO_LENGTH = 3
 
+########## Fetching Variables ##########################
+FETCH_WORKERS = 8
+FETCH_TIMEOUT = 30
+DEFAULT_HOST_CONCURRENCY = 2
+HOST_CONCURRENCY = {'www3.nhk.or.jp': 3, 'www3.asahi.com': 3, 'www.asahi.com': 3, 'www.yomiuri.co.jp': 2}
+MAX_REDIRECTS = 5
+# Minimum seconds between the starts of requests to a host; 0 leaves them limited by the host concurrency alone
+DEFAULT_HOST_REQUEST_INTERVAL = 0.0
+HOST_REQUEST_INTERVAL = {}
+USER_AGENT = 'JapaneseNewsScraper/1.0'
+VALIDATOR_STORE_NAME = 'FEED_VALIDATORS.json'
+# Keep the raw responses of each run on disk, so that they can be parsed again with JapaneseNewsScraper.py --replay
+RESPONSE_CACHE = False
+RESPONSE_CACHE_DIRECTORY = 'ResponseCache'
+RESPONSE_CACHE_MAX_BYTES = 2 * 1024 ** 3
+REPLAY_DATABASE_NAME = 'JAPAN_NEWS_REPLAY.db'
+
+########## Parsing Variables ##########################
+# Parser backend per News Source: 'soup' for JapaneseNewsScraperParser, 'lxml' for JapaneseNewsScraperLxmlParser.
+# NHK and Yomiuri stay on 'soup' until the lxml backend has been checked against saved live pages (the Fixtures are synthetic).
+# Asahi is the exception: the soup path raises IndexError on every item of an Asahi RDF feed, as <link> is parsed as a void element
+PARSER_BACKEND = {'NHK': 'soup', 'Asahi': 'lxml', 'Yomiuri': 'soup'}
+# Number of parse worker processes per parser backend; 0 parses on the fetch threads instead. An lxml parse costs well under
+# a millisecond and releases the GIL, so shipping its pages to another process costs more than it saves
+PARSE_WORKERS = {'soup': 2, 'lxml': 0}
+
+########## Vocabulary Index Variables ##########################
+VOCABULARY_INDEX_NAME = 'VOCABULARY'
+VOCABULARY_CHUNK_SIZE = 500
+# Number of segmenting processes for the vocabulary index; 0 segments in the indexing process
+VOCABULARY_WORKERS = 0
+
+########## Search Index Variables ##########################
+SEARCH_INDEX_NAME = 'SEARCH'
+SEARCH_INDEX_CHUNK_SIZE = 500
+
+########## Body Storage Variables ##########################
+# Store new bodies as zlib compressed BLOBs; existing bodies are converted with JapaneseNewsScraperBodyStore.py
+BODY_COMPRESSION = False
+BODY_COMPRESSION_LEVEL = 9
+# zlib uses at most the last 32 KiB of a preset dictionary
+BODY_DICTIONARY_SIZE = 32768
+BODY_DICTIONARY_SAMPLES = 200
+BODY_DICTIONARY_MIN_SAMPLES = 20
+BODY_CONVERT_CHUNK_SIZE = 500
+
+########## Daemon Variables ##########################
+FEED_SCHEDULE_NAME = 'FEED_SCHEDULE.json'
+# Bounds, in seconds, of the interval between polls of a feed, and the interval of a feed not yet polled
+FEED_MIN_INTERVAL = 120
+FEED_MAX_INTERVAL = 6 * 3600
+FEED_INITIAL_INTERVAL = 900
+# A feed is polled when this many new News Articles are expected on it
+FEED_TARGET_NEW_ARTICLES = 2
+# Weight of the latest poll in a feed's smoothed update rate
+FEED_RATE_SMOOTHING = 0.3
+# Growth of the interval of a feed that has never had a new News Article, and per consecutive failed poll
+FEED_BACKOFF = 1.5
+FEED_FAILURE_BACKOFF = 2
+# Each interval is scaled by a random factor within this fraction either side of 1
+FEED_JITTER = 0.1
+# Minimum seconds between the starts of requests to a host in daemon mode
+DAEMON_HOST_REQUEST_INTERVAL = 1.0
+# Longest sleep between checks for due feeds, so that a stop request is noticed promptly
+DAEMON_MAX_SLEEP = 5
+# Seconds between reloads of the de-duplication index, so that its window follows the clock
+DAEMON_DEDUP_RELOAD_SECONDS = 6 * 3600
+# Seconds between run summaries written by the daemon
+DAEMON_SUMMARY_SECONDS = 3600
@@ -0,0 +1,74 @@
+################################################
+# Description: Database writing for the JapaneseNewsScraper. News Articles are written behind the scrape in batches,
+# one transaction per batch, on a WAL journaled database.
+
+import sqlite3, time
+import JapaneseNewsScraperConstants as constants
+
+def applyPragmas(conn):
+	""" Switches the database to WAL journaling and applies the tuned pragmas for batched writing. """
+	for pragma in constants.DATABASE_PRAGMAS:
+		conn.execute(pragma)
+
+class batchWriter:
+	def __init__(self, conn, processed, log, batchSize=None, batchSeconds=None, bodyCodec=None, metrics=None, onWritten=None):
+		self.__conn = conn
+		self.__processed = processed
+		self.__log = log
+		self.__batchSize = batchSize or constants.WRITE_BATCH_SIZE
+		self.__batchSeconds = constants.WRITE_BATCH_SECONDS if batchSeconds is None else batchSeconds
+		self.__bodyCodec = bodyCodec
+		self.__metrics = metrics
+		self.__onWritten = onWritten
+		self.__pending = []
+		self.__batchStarted = None
+	def __enter__(self):
+		return self
+	def __exit__(self, excType, excValue, excTraceback):
+		self.close()
+	def add(self, newsArticle):
+		""" Queues the News Article for writing. Writes the batch once it is full, or once its oldest News Article has waited too long. """
+		if not self.__pending:
+			self.__batchStarted = time.monotonic()
+		self.__pending.append(newsArticle)
+		if len(self.__pending) >= self.__batchSize or time.monotonic() - self.__batchStarted >= self.__batchSeconds:
+			self.flush()
+	def flush(self):
+		""" Writes the queued News Articles in a single transaction. If any News Article is rejected, the batch is rolled back and
+		written again one News Article at a time, so that each success and failure is still counted per News Article. Each News Article
+		written is passed to the onWritten callback inside the transaction that writes it, so that what the callback writes is committed or
+		rolled back along with the News Article. """
+		articles, self.__pending = self.__pending, []
+		if not articles:
+			return
+		startTime = time.perf_counter()
+		try:
+			with self.__conn:
+				self.__conn.executemany(constants.INSERT_ARTICLE, [article.getInsertTuple(self.__bodyCodec) for article in articles])
+				for article in articles:
+					self.written(article)
+			self.__processed['success'] += len(articles)
+		except sqlite3.Error:
+			with self.__conn:
+				for article in articles:
+					self.insertArticle(article)
+			if self.__metrics is not None:
+				self.__metrics.increment('database.fallbacks')
+		if self.__metrics is not None:
+			self.__metrics.observe('database.write', time.perf_counter() - startTime)
+	def insertArticle(self, newsArticle):
+		try:
+			self.__conn.execute(constants.INSERT_ARTICLE, newsArticle.getInsertTuple(self.__bodyCodec))
+			self.written(newsArticle)
+			self.__processed['success'] += 1
+		except sqlite3.IntegrityError:
+			self.__log("Article already exists in database: " + str(newsArticle))
+			self.__processed['failure'] += 1
+		except sqlite3.Error as e:
+			self.__log("Failed to write article to database: " + str(newsArticle) + ' \n' + str(e))
+			self.__processed['failure'] += 1
+	def written(self, newsArticle):
+		if self.__onWritten is not None:
+			self.__onWritten(newsArticle)
+	def close(self):
+		self.flush()
@@ -0,0 +1,52 @@
+################################################
+# Description: De-duplication of News Articles for the JapaneseNewsScraper. The keys of recently published News Articles
+# are loaded from the database once per run into a hashed set, so that checking an RSS item is a set lookup rather than a
+# database query. News Articles accepted during the run are added to the set, which also removes duplicates across feeds.
+
+import datetime
+import JapaneseNewsScraperConstants as constants
+
+class dedupIndex:
+	def __init__(self, db, windowDays=None):
+		self.__db = db
+		windowDays = constants.DEDUP_WINDOW_DAYS if windowDays is None else windowDays
+		self.__windowStart = str(datetime.datetime.now() - datetime.timedelta(days=windowDays))
+		self.__keys = set()
+		self.__hits = 0
+		self.__misses = 0
+		self.load()
+	def load(self):
+		""" Loads the keys of the News Articles published within the window from the database. """
+		self.__db.execute(constants.LOAD_RECENT_ARTICLE_KEYS, (self.__windowStart,))
+		self.__keys.update(hash(key) for key in self.__db.fetchall())
+	def getKey(self, article):
+		return hash((article.getTitle(), article.getPubDatetime()))
+	def getHits(self):
+		return self.__hits
+	def getMisses(self):
+		return self.__misses
+	def filterNew(self, articles):
+		""" Returns the News Articles that are neither in the database nor already accepted during this run, and records them as seen.
+		News Articles published before the window are checked against the database in a single batched query. """
+		older = [article for article in articles if article.getPubDatetime() < self.__windowStart]
+		self.loadArticleKeys(older)
+		newArticles = []
+		for article in articles:
+			key = self.getKey(article)
+			if key in self.__keys:
+				self.__hits += 1
+			else:
+				self.__keys.add(key)
+				self.__misses += 1
+				newArticles.append(article)
+		return newArticles
+	def discard(self, article):
+		""" Forgets a News Article accepted by filterNew that could not be written, so that it is accepted again when next listed. """
+		self.__keys.discard(self.getKey(article))
+	def loadArticleKeys(self, articles):
+		""" Loads the database keys of any News Articles sharing a title with the specified News Articles. """
+		titles = list({article.getTitle() for article in articles})
+		for start in range(0, len(titles), constants.DEDUP_QUERY_BATCH_SIZE):
+			batch = titles[start:start + constants.DEDUP_QUERY_BATCH_SIZE]
+			self.__db.execute(constants.CHECK_FOR_ARTICLES % ','.join('?' * len(batch)), batch)
+			self.__keys.update(hash(key) for key in self.__db.fetchall())
@@ -0,0 +1,217 @@
+################################################
+# Description: Concurrent fetch engine for the JapaneseNewsScraper. RSS pages and News Article pages are fetched on a
+# bounded thread pool, limiting the number of requests in flight both globally and per host. Connections are kept alive
+# and reused per host, and RSS pages are requested conditionally using the validators stored from the previous run.
+# Full responses can also be written to a response cache, from which they can be replayed later. Requests to a host can
+# be spaced by a minimum interval, as the daemon mode does to keep within each site's rate limits. With run metrics, the
+# time each request spends on the wire is timed per host, apart from the time spent waiting for a request slot.
+
+import urllib.request, urllib.parse, urllib.error, http.client, threading, json, gzip, os, time, contextlib
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+import JapaneseNewsScraperConstants as constants
+
+class fetchEngine:
+	def __init__(self, workers=None, hostConcurrency=None, defaultHostConcurrency=None, timeout=None, validators=None, cache=None, requestInterval=None, metrics=None, stopping=None):
+		self.__workers = workers or constants.FETCH_WORKERS
+		self.__hostConcurrency = constants.HOST_CONCURRENCY if hostConcurrency is None else hostConcurrency
+		self.__defaultHostConcurrency = defaultHostConcurrency or constants.DEFAULT_HOST_CONCURRENCY
+		self.__timeout = timeout or constants.FETCH_TIMEOUT
+		self.__validators = validators
+		self.__cache = cache
+		self.__metrics = metrics
+		self.__stopping = stopping
+		self.__requestInterval = constants.DEFAULT_HOST_REQUEST_INTERVAL if requestInterval is None else requestInterval
+		self.__hostSemaphores = {}
+		self.__hostNextRequest = {}
+		self.__lock = threading.Lock()
+		self.__pool = connectionPool(self.__timeout)
+		self.__executor = ThreadPoolExecutor(max_workers=self.__workers)
+	def __enter__(self):
+		return self
+	def __exit__(self, excType, excValue, excTraceback):
+		self.close()
+	def getWorkers(self):
+		return self.__workers
+	def getValidators(self):
+		return self.__validators
+	def getHostSemaphore(self, url):
+		""" Returns the semaphore limiting the number of concurrent requests to the host of the specified URL. """
+		host = urllib.parse.urlsplit(url).netloc.lower()
+		with self.__lock:
+			if host not in self.__hostSemaphores:
+				limit = self.__hostConcurrency.get(host, self.__defaultHostConcurrency)
+				self.__hostSemaphores[host] = threading.BoundedSemaphore(limit)
+			return self.__hostSemaphores[host]
+	def timer(self, name):
+		return self.__metrics.timer(name) if self.__metrics is not None else contextlib.nullcontext()
+	def waitForHostSlot(self, url):
+		""" Blocks until the next request slot of the URL's host, at least the host's request interval after the previous slot given out.
+		Raises URLError instead if the engine's stop event is set, before or while waiting. """
+		if self.__stopping is not None and self.__stopping.is_set():
+			raise urllib.error.URLError("Stopped before requesting URL: " + url)
+		host = urllib.parse.urlsplit(url).netloc.lower()
+		interval = constants.HOST_REQUEST_INTERVAL.get(host, self.__requestInterval)
+		if interval <= 0:
+			return
+		with self.__lock:
+			now = time.monotonic()
+			slot = max(now, self.__hostNextRequest.get(host, now))
+			self.__hostNextRequest[host] = slot + interval
+		if slot > now:
+			if self.__stopping is None:
+				time.sleep(slot - now)
+			elif self.__stopping.wait(slot - now):
+				raise urllib.error.URLError("Stopped before requesting URL: " + url)
+	def request(self, url, headers=None):
+		""" Requests the specified URL over a pooled connection, following redirects. Returns the status, response headers, and body of the final response.
+		Blocks until the URL's host has a free request slot, timed as fetch.wait, and times the request itself as fetch.<host>.
+		Raises HTTPError for error statuses, as urlopen does. """
+		for redirect in range(constants.MAX_REDIRECTS + 1):
+			host = urllib.parse.urlsplit(url).netloc.lower()
+			with contextlib.ExitStack() as slot:
+				with self.timer('fetch.wait'):
+					self.waitForHostSlot(url)
+					slot.enter_context(self.getHostSemaphore(url))
+				with self.timer('fetch.' + host):
+					status, reason, responseHeaders, body = self.__pool.request(url, headers or {})
+			if status in (301, 302, 303, 307, 308) and responseHeaders.get('Location'):
+				url = urllib.parse.urljoin(url, responseHeaders['Location'])
+				continue
+			if status >= 400:
+				raise urllib.error.HTTPError(url, status, reason, responseHeaders, None)
+			return (status, responseHeaders, body)
+		raise urllib.error.URLError("Too many redirects for URL: " + url)
+	def fetch(self, url):
+		""" Returns the raw response bytes of the specified URL. """
+		status, responseHeaders, body = self.request(url)
+		if self.__cache is not None:
+			self.__cache.put(url, body)
+		return body
+	def fetchIfModified(self, url):
+		""" Returns the raw response bytes and response headers of the specified URL, or None if it has not been modified since the validators were stored.
+		The validators of the response are not stored until updateValidators is called with its headers, once the response has been parsed successfully,
+		so that a page that failed to parse is requested in full again next time. Without a validator store this always requests the full page. """
+		requestHeaders = self.__validators.getRequestHeaders(url) if self.__validators is not None else None
+		status, responseHeaders, body = self.request(url, requestHeaders)
+		if status == 304:
+			return None
+		if self.__cache is not None:
+			self.__cache.put(url, body)
+		return (body, responseHeaders)
+	def updateValidators(self, url, responseHeaders):
+		""" Stores the validators of a full response to the URL returned by fetchIfModified, if there is a validator store. """
+		if self.__validators is not None:
+			self.__validators.update(url, responseHeaders)
+	def imapUnordered(self, function, items):
+		""" Applies the function to each item on the thread pool, yielding (item, future) pairs in order of completion.
+		Items are pulled lazily, so at most twice the worker count are in flight at once. """
+		items = iter(items)
+		pending = {}
+		exhausted = False
+		while True:
+			while not exhausted and len(pending) < self.__workers * 2:
+				try:
+					item = next(items)
+				except StopIteration:
+					exhausted = True
+					break
+				pending[self.__executor.submit(function, item)] = item
+			if not pending:
+				return
+			done, notDone = wait(pending, return_when=FIRST_COMPLETED)
+			for future in done:
+				yield (pending.pop(future), future)
+	def close(self):
+		self.__executor.shutdown(wait=True, cancel_futures=True)
+		self.__pool.close()
+
+class connectionPool:
+	def __init__(self, timeout):
+		self.__timeout = timeout
+		self.__idle = {}
+		self.__lock = threading.Lock()
+	def acquire(self, scheme, host):
+		""" Returns an idle keep-alive connection to the host, or a new connection if none is idle. The boolean is True for a reused connection. """
+		with self.__lock:
+			idle = self.__idle.get((scheme, host))
+			if idle:
+				return (idle.pop(), True)
+		connectionClass = http.client.HTTPSConnection if scheme == 'https' else http.client.HTTPConnection
+		return (connectionClass(host, timeout=self.__timeout), False)
+	def release(self, scheme, host, connection):
+		with self.__lock:
+			self.__idle.setdefault((scheme, host), []).append(connection)
+	def request(self, url, headers):
+		""" Sends a GET request for the URL and reads the whole response. Retries once on a fresh connection if a reused connection was closed by the server. """
+		parts = urllib.parse.urlsplit(url)
+		scheme, host = parts.scheme.lower(), parts.netloc.lower()
+		path = parts.path or '/'
+		if parts.query:
+			path += '?' + parts.query
+		requestHeaders = {'User-Agent': constants.USER_AGENT, 'Accept-Encoding': 'gzip'}
+		requestHeaders.update(headers)
+		while True:
+			connection, reused = self.acquire(scheme, host)
+			try:
+				connection.request('GET', path, headers=requestHeaders)
+				response = connection.getresponse()
+				body = response.read()
+			except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+				connection.close()
+				if reused:
+					continue
+				raise
+			except Exception:
+				connection.close()
+				raise
+			if response.will_close:
+				connection.close()
+			else:
+				self.release(scheme, host, connection)
+			if response.getheader('Content-Encoding', '').lower() == 'gzip':
+				body = gzip.decompress(body)
+			return (response.status, response.reason, response.headers, body)
+	def close(self):
+		with self.__lock:
+			for connections in self.__idle.values():
+				for connection in connections:
+					connection.close()
+			self.__idle = {}
+
+class validatorStore:
+	def __init__(self, fileName):
+		self.__fileName = fileName
+		self.__validators = {}
+		self.__lock = threading.Lock()
+		if os.path.exists(fileName):
+			with open(fileName, 'r', encoding='UTF-8') as validatorFile:
+				self.__validators = json.load(validatorFile)
+	def getRequestHeaders(self, url):
+		""" Returns the conditional request headers for the URL from its stored ETag and Last-Modified validators. """
+		with self.__lock:
+			validators = self.__validators.get(url, {})
+		headers = {}
+		if validators.get('etag'):
+			headers['If-None-Match'] = validators['etag']
+		if validators.get('lastModified'):
+			headers['If-Modified-Since'] = validators['lastModified']
+		return headers
+	def update(self, url, responseHeaders):
+		""" Stores the ETag and Last-Modified validators of a full response to the URL. """
+		validators = {'etag': responseHeaders.get('ETag'), 'lastModified': responseHeaders.get('Last-Modified')}
+		with self.__lock:
+			if validators['etag'] or validators['lastModified']:
+				self.__validators[url] = validators
+			else:
+				self.__validators.pop(url, None)
+	def forget(self, url):
+		""" Drops the validators of the URL, so that it is next requested in full. """
+		with self.__lock:
+			self.__validators.pop(url, None)
+	def save(self):
+		""" Writes the validators to disk, replacing the previous file only once the new one is complete. """
+		with self.__lock:
+			contents = json.dumps(self.__validators, indent=1, sort_keys=True)
+		with open(self.__fileName + '.tmp', 'w', encoding='UTF-8') as validatorFile:
+			validatorFile.write(contents)
+		os.replace(self.__fileName + '.tmp', self.__fileName)
@@ -0,0 +1,117 @@
+################################################
+# Description: Fast-path parser backend for the JapaneseNewsScraper. Mirrors the functions of JapaneseNewsScraperParser,
+# but works on the raw page bytes: RSS Pages are streamed with lxml.etree.iterparse, one item at a time, and News
+# Source pages are parsed with lxml.html and read with targeted XPath queries, without building a BeautifulSoup tree.
+
+import io
+from lxml import etree, html
+import JapaneseNewsScraperParser as parser
+from JapaneseNewsArticle import newsArticle
+
+RSS_NAMESPACE = '{http://purl.org/rss/1.0/}'
+DC_NAMESPACE = '{http://purl.org/dc/elements/1.1/}'
+HTML_PARSER = html.HTMLParser(encoding='UTF-8')
+
+def getPage(pageBytes):
+	""" Returns the page as the backend's functions expect it, the raw page bytes. """
+	return pageBytes
+
+def getHtmlPage(pageBytes):
+	""" Returns an lxml.html tree of the raw page bytes, or None for an empty page. """
+	if not pageBytes or not pageBytes.strip():
+		return None
+	return html.fromstring(pageBytes, parser=HTML_PARSER)
+
+def iterRssItems(pageBytes, itemTag):
+	""" Streams the items of an RSS Page, yielding each item element and freeing it once it has been read. """
+	if not pageBytes:
+		return
+	for event, item in etree.iterparse(io.BytesIO(pageBytes), events=('end',), tag=itemTag, recover=True):
+		yield item
+		item.clear()
+		while item.getprevious() is not None:
+			del item.getparent()[0]
+
+def hasClass(className):
+	return "contains(concat(' ', normalize-space(@class), ' '), ' %s ')" % className
+
+
+################## getRssArticles() ###########################
+def getAsahiRssArticles(page):
+	""" Streams the Asahi RSS Page into a list of News Articles. """
+	titlePubdateUrl = getAsahiPageArticleTitlePubdateUrl(iterRssItems(page, RSS_NAMESPACE + 'item'))
+	return newsArticle.fromTuples(titlePubdateUrl)
+
+def getNhkRssArticles(page):
+	""" Streams the NHK RSS Page into a list of News Articles. """
+	titlePubdateUrl = getNhkPageArticleTitlePubdateUrl(iterRssItems(page, 'item'))
+	return newsArticle.fromTuples(titlePubdateUrl)
+
+def getYomiuriRssArticles(page):
+	""" Processes the Yomiuri listing page into a list of News Articles, reading only the items of the first list-common list. """
+	tree = getHtmlPage(page)
+	items = []
+	if tree is not None:
+		items = tree.xpath("(//ul[%s])[1]/li" % hasClass('list-common'))
+	titlePubdateUrl = getYomiuriPageArticleTitlePubdateUrl(items)
+	return newsArticle.fromTuples(titlePubdateUrl)
+
+
+################# getTitlePubdateUrl() ########################
+def getAsahiPageArticleTitlePubdateUrl(items):
+	""" Reads the Title, PubDatetime, and URL of each Asahi RSS item, skipping items missing any of them. """
+	titlePubdateUrl = []
+	for item in items:
+		title, pubdate, url = (item.findtext(RSS_NAMESPACE + 'title'), item.findtext(DC_NAMESPACE + 'date'), item.findtext(RSS_NAMESPACE + 'link'))
+		if title and pubdate and url:
+			titlePubdateUrl.append( (title, parser.parseAsahiPubDate(pubdate.strip()), url.strip()) )
+	return titlePubdateUrl
+
+def getNhkPageArticleTitlePubdateUrl(items):
+	""" Reads the Title, PubDatetime, and URL of each NHK RSS item, skipping items missing any of them. """
+	titlePubdateUrl = []
+	for item in items:
+		title, pubdate, url = (item.findtext('title'), item.findtext('pubDate'), item.findtext('guid'))
+		if title and pubdate and url:
+			titlePubdateUrl.append( (title, parser.parseNhkPubDate(pubdate.strip()), url.strip()) )
+	return titlePubdateUrl
+
+def getYomiuriPageArticleTitlePubdateUrl(items):
+	""" Reads the Title, PubDatetime, and URL of each Yomiuri list item, skipping items missing any of them. """
+	titlePubdateUrl = []
+	for item in items:
+		headline = item.xpath("(.//span[%s])[1]/text()" % hasClass('headline'))
+		update = item.xpath("(.//span[%s])[1]/text()" % hasClass('update'))
+		url = item.xpath("(.//a)[1]/@href")
+		if headline and update and url:
+			titlePubdateUrl.append( (str(headline[0]), parser.parseYomiuriPubDate(str(update[0])), str(url[0])) )
+	return titlePubdateUrl
+
+
+################# getNewsArticleBody() ############################
+def getAsahiNewsArticleBody(page):
+	""" Processes and returns the Asahi News Article Body from the raw News Article page. """
+	tree = getHtmlPage(page)
+	body = ""
+	if tree is not None:
+		body = "".join(p.text for p in tree.xpath("(//div[%s])[1]//p" % hasClass('ArticleText')) if p.text)
+	return body.replace("\u3000", "")
+
+def getNhkNewsArticleBody(page):
+	""" Processes and returns the NHK News Article Body from the raw News Article page. """
+	tree = getHtmlPage(page)
+	body = ""
+	if tree is not None:
+		newsTextBody = tree.xpath("(//div[@id='news_textbody'])[1]")
+		newsTextMore = tree.xpath("(//div[@id='news_textmore'])[1]")
+		if newsTextBody and newsTextMore:
+			body = (newsTextBody[0].text or "") + (newsTextMore[0].text or "")
+	return body
+
+def getYomiuriNewsArticleBody(page):
+	""" Processes and returns the Yomiuri News Article Body from the raw News Article page. """
+	tree = getHtmlPage(page)
+	body = ""
+	if tree is not None:
+		body = "".join(p.text for p in tree.xpath("//p[@itemprop='articleBody']") if p.text)
+	return body
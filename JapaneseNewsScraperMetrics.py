@@ -0,0 +1,89 @@
+################################################
+# Description: Run metrics for the JapaneseNewsScraper. Counts and times each stage of a run (fetching per News Source,
+# parsing, database writes, de-duplication) from any thread, and writes the summary as JSON at the end of the run. Each
+# timer keeps fixed histogram bucket counts and a bounded random sample of its timings for the percentiles, so memory and
+# the cost of a summary stay constant however long the process runs.
+
+import threading, time, json, contextlib, math, datetime, os, random
+import JapaneseNewsScraperConstants as constants
+
+class timingHistogram:
+	def __init__(self, bucketsMs=None, reservoirSize=None, randomizer=None):
+		self.__bucketsMs = bucketsMs or constants.METRICS_LATENCY_BUCKETS_MS
+		self.__reservoirSize = reservoirSize or constants.METRICS_RESERVOIR_SIZE
+		self.__randomizer = randomizer or random.Random()
+		self.__bucketCounts = [0] * (len(self.__bucketsMs) + 1)
+		self.__count = 0
+		self.__totalMs = 0.0
+		self.__minMs = None
+		self.__maxMs = None
+		self.__reservoir = []
+	def observe(self, milliseconds):
+		""" Counts the timing in its bucket and the totals, and keeps it in the sample with equal chance for every timing observed. """
+		self.__bucketCounts[next((index for (index, bound) in enumerate(self.__bucketsMs) if milliseconds <= bound), len(self.__bucketsMs))] += 1
+		self.__count += 1
+		self.__totalMs += milliseconds
+		self.__minMs = milliseconds if self.__minMs is None else min(self.__minMs, milliseconds)
+		self.__maxMs = milliseconds if self.__maxMs is None else max(self.__maxMs, milliseconds)
+		if len(self.__reservoir) < self.__reservoirSize:
+			self.__reservoir.append(milliseconds)
+		else:
+			index = self.__randomizer.randrange(self.__count)
+			if index < self.__reservoirSize:
+				self.__reservoir[index] = milliseconds
+	def getPercentile(self, samplesMs, percentile):
+		return samplesMs[max(0, math.ceil(len(samplesMs) * percentile / 100.0) - 1)]
+	def getSummary(self):
+		""" Returns the count, total, and spread of the timings in milliseconds, with the count of timings in each histogram bucket.
+		The percentiles are estimated from the sample once there are more timings than the sample holds. """
+		if not self.__count:
+			return {'count': 0}
+		samplesMs = sorted(self.__reservoir)
+		labels = ["<=%g" % bound for bound in self.__bucketsMs] + [">%g" % self.__bucketsMs[-1]]
+		buckets = {label: count for (label, count) in zip(labels, self.__bucketCounts) if count}
+		return {'count': self.__count, 'totalMs': round(self.__totalMs, 3), 'minMs': round(self.__minMs, 3), 'meanMs': round(self.__totalMs / self.__count, 3),
+			'p50Ms': round(self.getPercentile(samplesMs, 50), 3), 'p95Ms': round(self.getPercentile(samplesMs, 95), 3), 'maxMs': round(self.__maxMs, 3), 'buckets': buckets}
+
+class runMetrics:
+	def __init__(self):
+		self.__counters = {}
+		self.__timers = {}
+		self.__values = {}
+		self.__lock = threading.Lock()
+		self.__started = datetime.datetime.now()
+		self.__startTime = time.perf_counter()
+	def increment(self, name, amount=1):
+		with self.__lock:
+			self.__counters[name] = self.__counters.get(name, 0) + amount
+	def getCounter(self, name):
+		with self.__lock:
+			return self.__counters.get(name, 0)
+	def setValue(self, name, value):
+		with self.__lock:
+			self.__values[name] = value
+	def observe(self, name, seconds):
+		with self.__lock:
+			if name not in self.__timers:
+				self.__timers[name] = timingHistogram()
+			self.__timers[name].observe(seconds * 1000.0)
+	@contextlib.contextmanager
+	def timer(self, name):
+		""" Times the enclosed block under the name, whether or not it raises. """
+		startTime = time.perf_counter()
+		try:
+			yield
+		finally:
+			self.observe(name, time.perf_counter() - startTime)
+	def getSummary(self):
+		""" Returns the run summary: when the run started and how long it took, the counters, the timers, and the recorded values. """
+		with self.__lock:
+			return {'started': self.__started.isoformat(timespec='seconds'), 'seconds': round(time.perf_counter() - self.__startTime, 3),
+				'counters': dict(sorted(self.__counters.items())), 'timers': {name: timer.getSummary() for (name, timer) in sorted(self.__timers.items())},
+				'values': dict(sorted(self.__values.items()))}
+	def writeSummary(self, fileName):
+		""" Writes the run summary to the file as JSON, and returns it. """
+		summary = self.getSummary()
+		with open(fileName + '.tmp', 'w', encoding='UTF-8') as summaryFile:
+			json.dump(summary, summaryFile, indent=1, ensure_ascii=False)
+		os.replace(fileName + '.tmp', fileName)
+		return summary
@@ -0,0 +1,62 @@
+################################################
+# Description: Parse workers for the JapaneseNewsScraper. Parsing News Source pages is CPU-bound and holds the GIL, so
+# raw page bytes are shipped to a pool of worker processes, and only the extracted Titles, PubDatetimes, URLs, and
+# bodies are sent back. Fetch threads block on the result without holding the GIL, leaving network I/O unaffected.
+# The lxml backend is fast and releases the GIL, so by default only the BeautifulSoup backend's pages go to the pool.
+
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+import JapaneseNewsScraperParser as parser, JapaneseNewsScraperLxmlParser as lxmlparser
+import JapaneseNewsScraperConstants as constants
+
+PARSERS = {'soup': parser, 'lxml': lxmlparser}
+
+def getParser(source, backend=None):
+	""" Returns the parser backend module for the specified News Source, the configured one unless a backend is named. """
+	return PARSERS[backend or constants.PARSER_BACKEND.get(source, 'soup')]
+
+def parseRssPage(source, pageBytes, backend=None):
+	""" Parses the raw RSS Page of the News Source into a list of (Title, PubDatetime, URL) tuples of plain values. """
+	sourceParser = getParser(source, backend)
+	articles = getattr(sourceParser, "get" + source.title() + "RssArticles")(sourceParser.getPage(pageBytes))
+	titlePubdateUrl = []
+	for article in articles:
+		title, pubDatetime = article.getCheckTuple()
+		titlePubdateUrl.append( (str(title), pubDatetime, str(article.getUrl())) )
+	return titlePubdateUrl
+
+def parseNewsArticleBody(source, pageBytes, backend=None):
+	""" Parses the raw News Article page of the News Source into its body, as a plain string. """
+	sourceParser = getParser(source, backend)
+	return str(getattr(sourceParser, "get" + source.title() + "NewsArticleBody")(sourceParser.getPage(pageBytes)))
+
+class parsePool:
+	def __init__(self, workers=None):
+		""" Starts the worker processes for the parser backends configured to use them. A number of workers, if given, applies to every backend. """
+		if workers is None:
+			self.__workers = dict(constants.PARSE_WORKERS)
+		else:
+			self.__workers = {backend: workers for backend in PARSERS}
+		self.__executor = None
+		if max(self.__workers.values(), default=0) > 0:
+			self.__executor = ProcessPoolExecutor(max_workers=max(self.__workers.values()), mp_context=multiprocessing.get_context('spawn'))
+	def __enter__(self):
+		return self
+	def __exit__(self, excType, excValue, excTraceback):
+		self.close()
+	def getWorkers(self, backend):
+		return self.__workers.get(backend, 0)
+	def run(self, function, source, pageBytes):
+		""" Runs the parse function on a worker process and waits for its result, or runs it in the calling thread when the News Source's
+		parser backend has no workers. The parser backend is resolved here, so that worker processes follow the current configuration. """
+		backend = constants.PARSER_BACKEND.get(source, 'soup')
+		if self.getWorkers(backend) == 0:
+			return function(source, pageBytes, backend)
+		return self.__executor.submit(function, source, pageBytes, backend).result()
+	def parseRssPage(self, source, pageBytes):
+		return self.run(parseRssPage, source, pageBytes)
+	def parseNewsArticleBody(self, source, pageBytes):
+		return self.run(parseNewsArticleBody, source, pageBytes)
+	def close(self):
+		if self.__executor is not None:
+			self.__executor.shutdown(wait=True, cancel_futures=True)
@@ -5,14 +5,18 @@ from bs4 import BeautifulSoup
 import JapaneseNewsScraperConstants as constants
 from JapaneseNewsArticle import newsArticle
 
+def getPage(pageBytes):
+	""" Returns a BeautifulSoup page of the specified raw page bytes. """
+	pageText = str(pageBytes, 'UTF-8')
+	return BeautifulSoup(pageText, "lxml")
+
 ################## getRssArticles() ###########################
 def getAsahiRssArticles(page):
 	""" Processes the Asahi RSS Page Source into a list of Titles, PubDatetimes, and URLs.
 	A list of News Articles is then formed from the list of News Article information.  """
 	items = page.findAll('item')
 	titlePubdateUrl = getAsahiPageArticleTitlePubdateUrl(items)
-	articles = [ newsArticle(title, pubdate, url) \
-		for (title, pubdate, url) in titlePubdateUrl ]
+	articles = newsArticle.fromTuples(titlePubdateUrl)
 	return articles
 
 def getNhkRssArticles(page):
@@ -20,8 +24,7 @@ def getNhkRssArticles(page):
 	A list of News Articles is then formed from the list of News Article information.  """
 	items = page.findAll('item')
 	titlePubdateUrl = getNhkPageArticleTitlePubdateUrl(items)
-	articles = [ newsArticle(title, pubdate, url) \
-		for (title, pubdate, url) in titlePubdateUrl ]
+	articles = newsArticle.fromTuples(titlePubdateUrl)
 	return articles	
 
 def getYomiuriRssArticles(page):
@@ -32,8 +35,7 @@ def getYomiuriRssArticles(page):
 	if unorderedList:
 		items = unorderedList[0].findAll('li')
 	titlePubdateUrl = getYomiuriPageArticleTitlePubdateUrl(items)
-	articles = [ newsArticle(title, pubdate, url) \
-		for (title, pubdate, url) in titlePubdateUrl ]
+	articles = newsArticle.fromTuples(titlePubdateUrl)
 	return articles	
 
 
@@ -0,0 +1,107 @@
+################################################
+# Description: Raw response cache for the JapaneseNewsScraper. The fetch engine can write every full response it
+# receives to a content-addressed store on disk, one file per distinct response body named by its SHA-256 digest, with
+# an index of which URL returned which bodies and when. The store is bounded in size, evicting the least recently used
+# bodies first. The replay engine serves a scrape entirely from the cache, so that the parse and insert stages can be
+# re-run over past responses, for instance after a parser fix, without any network requests.
+
+import sqlite3, hashlib, threading, time, os, urllib.error
+import JapaneseNewsScraperConstants as constants, JapaneseNewsScraperFetcher as fetcher
+
+class responseCache:
+	def __init__(self, directory=None, maxBytes=None):
+		self.__directory = directory or constants.RESPONSE_CACHE_DIRECTORY
+		self.__maxBytes = maxBytes or constants.RESPONSE_CACHE_MAX_BYTES
+		self.__lock = threading.Lock()
+		os.makedirs(self.__directory, exist_ok=True)
+		self.__conn = sqlite3.connect(os.path.join(self.__directory, 'INDEX.db'), check_same_thread=False)
+		for sqlCreateTable in constants.CREATE_RESPONSE_CACHE_TABLES:
+			self.__conn.execute(sqlCreateTable)
+		self.__size = self.__conn.execute(constants.SUM_RESPONSE_CACHE_SIZE).fetchone()[0]
+		self.__conn.commit()
+	def __enter__(self):
+		return self
+	def __exit__(self, excType, excValue, excTraceback):
+		self.close()
+	def getSize(self):
+		return self.__size
+	def getObjectPath(self, digest):
+		return os.path.join(self.__directory, digest[:2], digest)
+	def put(self, url, body):
+		""" Stores the response body of the URL, writing the body only if no earlier response had the same content. Evicts the least
+		recently used bodies if the cache has grown over its size limit. """
+		digest = hashlib.sha256(body).hexdigest()
+		path = self.getObjectPath(digest)
+		now = time.time()
+		with self.__lock:
+			if not os.path.exists(path):
+				os.makedirs(os.path.dirname(path), exist_ok=True)
+				with open(path + '.tmp', 'wb') as objectFile:
+					objectFile.write(body)
+				os.replace(path + '.tmp', path)
+			with self.__conn:
+				if self.__conn.execute(constants.INSERT_RESPONSE_OBJECT, (digest, len(body), now)).rowcount:
+					self.__size += len(body)
+				else:
+					self.__conn.execute(constants.TOUCH_RESPONSE_OBJECT, (now, digest))
+				self.__conn.execute(constants.INSERT_RESPONSE, (url, digest, now))
+			if self.__size > self.__maxBytes:
+				self.evict()
+		return digest
+	def getVersions(self, url):
+		""" Returns the digests of the bodies cached for the URL, oldest response first. """
+		with self.__lock:
+			return [digest for (digest,) in self.__conn.execute(constants.SELECT_RESPONSE_VERSIONS, (url,))]
+	def read(self, digest):
+		""" Returns the cached body with the digest, or None if it has been evicted. """
+		try:
+			with open(self.getObjectPath(digest), 'rb') as objectFile:
+				body = objectFile.read()
+		except FileNotFoundError:
+			return None
+		with self.__lock, self.__conn:
+			self.__conn.execute(constants.TOUCH_RESPONSE_OBJECT, (time.time(), digest))
+		return body
+	def get(self, url):
+		""" Returns the most recent cached response body of the URL, or None if the URL is not cached. """
+		versions = self.getVersions(url)
+		return self.read(versions[-1]) if versions else None
+	def evict(self):
+		""" Deletes the least recently used bodies, and the responses that returned them, until the cache is within 90% of its size limit. """
+		while self.__size > self.__maxBytes * 0.9:
+			leastRecent = self.__conn.execute(constants.SELECT_LEAST_RECENT_OBJECTS, (100,)).fetchall()
+			if not leastRecent:
+				break
+			with self.__conn:
+				for (digest, size) in leastRecent:
+					self.__conn.execute(constants.DELETE_RESPONSES, (digest,))
+					self.__conn.execute(constants.DELETE_RESPONSE_OBJECT, (digest,))
+					if os.path.exists(self.getObjectPath(digest)):
+						os.remove(self.getObjectPath(digest))
+					self.__size -= size
+					if self.__size <= self.__maxBytes * 0.9:
+						break
+	def close(self):
+		with self.__lock:
+			self.__conn.close()
+
+class replayEngine(fetcher.fetchEngine):
+	""" A fetch engine that serves every URL from the response cache instead of the network. Each call of fetchIfModified for a URL
+	returns the next of its cached responses, oldest first, so that every cached version of an RSS Page is replayed once. """
+	def __init__(self, cache, workers=None):
+		super().__init__(workers=workers)
+		self.__cache = cache
+		self.__replayed = {}
+		self.__lock = threading.Lock()
+	def request(self, url, headers=None):
+		body = self.__cache.get(url)
+		if body is None:
+			raise urllib.error.URLError("Not in the response cache: " + url)
+		return (200, {}, body)
+	def fetchIfModified(self, url):
+		""" Returns the next cached response of the URL not yet replayed, with no response headers, or None once all of them have been. """
+		with self.__lock:
+			if url not in self.__replayed:
+				self.__replayed[url] = iter(self.__cache.getVersions(url))
+			digest = next(self.__replayed[url], None)
+		return (self.__cache.read(digest), {}) if digest is not None else None
@@ -0,0 +1,99 @@
+################################################
+# Description: Adaptive feed polling for the daemon mode of the JapaneseNewsScraper. Each RSS Page is polled on its own
+# interval, derived from its observed update rate: a smoothed count of new News Articles per second across its polls.
+# Busy feeds are polled often, and each poll that finds nothing new lowers the rate, so quiet feeds back off towards the
+# longest interval. Failed polls back off exponentially, and every interval is jittered so that polls do not bunch up.
+# The schedule is saved between runs, so a restarted daemon keeps what it has learned.
+
+import json, os, random, time, threading
+import JapaneseNewsScraperConstants as constants
+
+class feedSchedule:
+	def __init__(self, url, genre, source, interval=None, rate=None, failures=0, nextPoll=0.0, lastPoll=None):
+		self.__urlGenreSource = (url, genre, source)
+		self.__interval = interval or constants.FEED_INITIAL_INTERVAL
+		self.__rate = rate
+		self.__failures = failures
+		self.__nextPoll = nextPoll
+		self.__lastPoll = lastPoll
+	def getUrlGenreSource(self):
+		return self.__urlGenreSource
+	def getUrl(self):
+		return self.__urlGenreSource[0]
+	def getInterval(self):
+		return self.__interval
+	def getRate(self):
+		return self.__rate
+	def getNextPoll(self):
+		return self.__nextPoll
+	def isDue(self, now):
+		return self.__nextPoll <= now
+	def recordPoll(self, newArticles, now, randomizer):
+		""" Updates the observed update rate with the number of new News Articles found since the last poll (0 if the RSS Page was not modified),
+		and schedules the next poll for when the target number of new News Articles is expected. """
+		self.__failures = 0
+		if self.__lastPoll is not None:
+			elapsed = max(1.0, now - self.__lastPoll)
+			observed = newArticles / elapsed
+			smoothing = constants.FEED_RATE_SMOOTHING
+			self.__rate = observed if self.__rate is None else smoothing * observed + (1 - smoothing) * self.__rate
+			if self.__rate > 0:
+				self.__interval = constants.FEED_TARGET_NEW_ARTICLES / self.__rate
+			else:
+				self.__interval *= constants.FEED_BACKOFF
+		self.__lastPoll = now
+		self.schedule(now, randomizer)
+	def recordFailure(self, now, randomizer):
+		""" Backs off exponentially from the feed's interval after consecutive failed polls, without changing its observed update rate. """
+		self.__failures += 1
+		self.schedule(now, randomizer, constants.FEED_FAILURE_BACKOFF ** self.__failures)
+	def schedule(self, now, randomizer, backoff=1.0):
+		self.__interval = min(constants.FEED_MAX_INTERVAL, max(constants.FEED_MIN_INTERVAL, self.__interval))
+		interval = min(constants.FEED_MAX_INTERVAL, self.__interval * backoff)
+		self.__nextPoll = now + interval * randomizer.uniform(1 - constants.FEED_JITTER, 1 + constants.FEED_JITTER)
+	def getState(self):
+		return {'interval': self.__interval, 'rate': self.__rate, 'failures': self.__failures, 'nextPoll': self.__nextPoll, 'lastPoll': self.__lastPoll}
+
+class feedScheduler:
+	def __init__(self, urlGenreSource, fileName=None, randomizer=None, clock=time.time):
+		self.__fileName = fileName
+		self.__randomizer = randomizer or random.Random()
+		self.__clock = clock
+		self.__lock = threading.Lock()
+		state = {}
+		if fileName and os.path.exists(fileName):
+			with open(fileName, 'r', encoding='UTF-8') as scheduleFile:
+				state = json.load(scheduleFile)
+		self.__feeds = {}
+		for (url, genre, source) in urlGenreSource:
+			self.__feeds[url] = feedSchedule(url, genre, source, **state.get(url, {}))
+	def getFeeds(self):
+		return list(self.__feeds.values())
+	def getDueFeeds(self):
+		""" Returns the (URL, Genre, Source) of each feed due to be polled, most overdue first. """
+		now = self.__clock()
+		with self.__lock:
+			due = sorted((feed for feed in self.__feeds.values() if feed.isDue(now)), key=lambda feed: feed.getNextPoll())
+		return [feed.getUrlGenreSource() for feed in due]
+	def getSecondsUntilNextPoll(self):
+		with self.__lock:
+			return max(0.0, min(feed.getNextPoll() for feed in self.__feeds.values()) - self.__clock())
+	def recordPoll(self, url, newArticles):
+		""" Records the outcome of a poll: the number of new News Articles, 0 for an unmodified RSS Page, or None for a failed poll. """
+		with self.__lock:
+			feed = self.__feeds.get(url)
+			if feed is None:
+				return
+			if newArticles is None:
+				feed.recordFailure(self.__clock(), self.__randomizer)
+			else:
+				feed.recordPoll(newArticles, self.__clock(), self.__randomizer)
+	def save(self):
+		""" Writes the schedule to disk, replacing the previous file only once the new one is complete. """
+		if not self.__fileName:
+			return
+		with self.__lock:
+			contents = json.dumps({url: feed.getState() for (url, feed) in self.__feeds.items()}, indent=1, sort_keys=True)
+		with open(self.__fileName + '.tmp', 'w', encoding='UTF-8') as scheduleFile:
+			scheduleFile.write(contents)
+		os.replace(self.__fileName + '.tmp', self.__fileName)
@@ -0,0 +1,67 @@
+################################################
+# Description: Versioned schema migrations for the Japanese News Database. The schema version is kept in SQLite's
+# user_version pragma; a database created before versioning, with its ARTICLES table keyed on the whole Body, is version 1.
+# Each migration upgrades the database in place, in its own transaction.
+#	Version 1: ARTICLES keyed on PRIMARY KEY(TITLE, PUBDATETIME, BODY).
+#	Version 2: ARTICLES keyed on a 16 byte ARTICLE_HASH of those columns, with an ARTICLE_ID rowid alias preserving the rowids,
+#	           and secondary indexes for de-duplication and Source, Genre, PubDatetime, and URL queries.
+
+import sqlite3
+import JapaneseNewsScraperConstants as constants
+from JapaneseNewsArticle import getArticleHash
+
+def getSchemaVersion(conn):
+	""" Returns the schema version of the database, or 0 for a database without an ARTICLES table. """
+	version = conn.execute("PRAGMA user_version").fetchone()[0]
+	if version == 0 and conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'ARTICLES'").fetchone():
+		version = 1
+	return version
+
+def upgradeSchema(conn, log=print):
+	""" Creates the current schema in a new database, or migrates an existing database to it one version at a time. """
+	version = getSchemaVersion(conn)
+	if version == 0:
+		with conn:
+			conn.execute(constants.CREATE_TABLE)
+			createIndexes(conn)
+			setSchemaVersion(conn, constants.SCHEMA_VERSION)
+		return
+	while version < constants.SCHEMA_VERSION:
+		log("Migrating the database schema from version %d to version %d..." % (version, version + 1))
+		MIGRATIONS[version](conn)
+		version = getSchemaVersion(conn)
+	with conn:
+		createIndexes(conn)
+
+def createIndexes(conn):
+	for sqlCreateIndex in constants.CREATE_INDEXES:
+		conn.execute(sqlCreateIndex)
+
+def setSchemaVersion(conn, version):
+	conn.execute("PRAGMA user_version = %d" % version)
+
+def runMigration(conn, statements, version):
+	""" Runs the migration statements and sets the new schema version in a single transaction, and then reclaims the space freed by the migration. """
+	isolationLevel = conn.isolation_level
+	conn.isolation_level = None
+	try:
+		conn.execute("BEGIN IMMEDIATE")
+		try:
+			for statement in statements:
+				conn.execute(statement)
+			setSchemaVersion(conn, version)
+			conn.execute("COMMIT")
+		except sqlite3.Error:
+			conn.execute("ROLLBACK")
+			raise
+		conn.execute("VACUUM")
+	finally:
+		conn.isolation_level = isolationLevel
+
+def migrateToVersion2(conn):
+	""" Rebuilds ARTICLES keyed on ARTICLE_HASH instead of the whole Body, keeping each row's rowid for the word and search indexes. """
+	conn.create_function('ARTICLE_HASH', 3, getArticleHash, deterministic=True)
+	runMigration(conn, constants.MIGRATE_ARTICLES_V2, 2)
+
+# Migration from each version to the next
+MIGRATIONS = {1: migrateToVersion2}
@@ -0,0 +1,83 @@
+################################################
+# Description: Full-text search for the JapaneseNewsScraper. Maintains an SQLite FTS5 index over the Title and Body of the
+# News Articles, built from the words of JapaneseNewsScraperTextSegmenter.parseText, since FTS5 has no tokenizer for
+# Japanese. The index is kept up to date by a trigger as News Articles are inserted, and can be queried by words with
+# filters on Source, Genre, and PubDatetime range.
+# Usage: python JapaneseNewsScraperSearch.py <query> [--source NHK] [--genre Society] [--from 2016-05-01] [--to 2016-05-04]
+
+import sqlite3, argparse
+import JapaneseNewsScraperTextSegmenter as segmenter, JapaneseNewsScraperConstants as constants
+import JapaneseNewsScraperBodyStore as bodystore
+
+def segmentText(text):
+	""" Returns the words of the text separated by spaces, the form in which FTS5 indexes them. """
+	if not text:
+		return ""
+	return " ".join(segmenter.parseText(text))
+
+def enableSearchIndex(conn):
+	""" Creates the search index if it does not exist, indexes any News Articles added without it, and installs the trigger that
+	indexes each News Article inserted on this connection from now on. """
+	conn.execute(constants.CREATE_INDEX_STATE)
+	conn.execute(constants.CREATE_SEARCH_INDEX)
+	conn.create_function('SEGMENT', 1, segmentText, deterministic=True)
+	bodystore.bodyStore(conn)
+	updateSearchIndex(conn)
+	conn.execute(constants.CREATE_SEARCH_INDEX_TRIGGER % constants.SEARCH_INDEX_NAME)
+	conn.commit()
+
+def updateSearchIndex(conn, chunkSize=None):
+	""" Indexes the News Articles added since the last indexed rowid, in chunks of one transaction each. Returns the number of News Articles indexed. """
+	chunkSize = chunkSize or constants.SEARCH_INDEX_CHUNK_SIZE
+	lastRowid = segmenter.getLastIndexedRowid(conn, constants.SEARCH_INDEX_NAME)
+	indexed = 0
+	while True:
+		rows = conn.execute(constants.SELECT_ARTICLES_TO_INDEX, (lastRowid, chunkSize)).fetchall()
+		if not rows:
+			break
+		lastRowid = rows[-1][0]
+		with conn:
+			conn.executemany(constants.INSERT_SEARCH_INDEX, [(rowid, segmentText(title), segmentText(body)) for (rowid, title, body) in rows])
+			conn.execute(constants.UPDATE_INDEX_STATE, (constants.SEARCH_INDEX_NAME, lastRowid))
+		indexed += len(rows)
+	return indexed
+
+def getMatchQuery(query):
+	""" Returns the FTS5 query matching News Articles that contain every word of the query. """
+	words = segmenter.parseText(query) or [word for word in segmenter.segmenter.tokenize(query) if word.strip()]
+	return " ".join('"%s"' % word.replace('"', '""') for word in words)
+
+def searchArticles(conn, query, source=None, genre=None, startDatetime=None, endDatetime=None, limit=20):
+	""" Returns the best matching News Articles for the query as (Title, URL, PubDatetime, Genre, Source) rows, optionally filtered by Source, Genre,
+	and an inclusive PubDatetime range. """
+	matchQuery = getMatchQuery(query)
+	if not matchQuery:
+		return []
+	conditions, parameters = [], [matchQuery]
+	for (condition, value) in [("ARTICLES.SOURCE = ?", source), ("ARTICLES.GENRE = ?", genre), ("ARTICLES.PUBDATETIME >= ?", startDatetime), ("ARTICLES.PUBDATETIME <= ?", endDatetime)]:
+		if value is not None:
+			conditions.append(condition)
+			parameters.append(str(value))
+	parameters.append(limit)
+	sqlSearch = constants.SEARCH_ARTICLES % "".join(" AND " + condition for condition in conditions)
+	return conn.execute(sqlSearch, parameters).fetchall()
+
+
+###################################################
+# Beginning of the program
+###################################################
+if __name__ == '__main__':
+	argumentParser = argparse.ArgumentParser(description="Searches the Title and Body of the scraped News Articles.")
+	argumentParser.add_argument('query')
+	argumentParser.add_argument('--database', default=constants.DATABASE_NAME)
+	argumentParser.add_argument('--source')
+	argumentParser.add_argument('--genre')
+	argumentParser.add_argument('--from', dest='startDatetime', help="earliest PubDatetime, e.g. 2016-05-01")
+	argumentParser.add_argument('--to', dest='endDatetime', help="latest PubDatetime, e.g. '2016-05-04 23:59:59'")
+	argumentParser.add_argument('--limit', type=int, default=20)
+	options = argumentParser.parse_args()
+	conn = sqlite3.connect(options.database)
+	enableSearchIndex(conn)
+	for (title, url, pubDatetime, genre, source) in searchArticles(conn, options.query, options.source, options.genre, options.startDatetime, options.endDatetime, options.limit):
+		print("%s | %s | %s/%s | %s" % (pubDatetime, title, source, genre, url))
+	conn.close()
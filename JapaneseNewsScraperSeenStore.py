@@ -0,0 +1,113 @@
+################################################
+# Description: URL seen-store for the JapaneseNewsScraper. Records the normalized URL of every News Article whose body has
+# been retrieved, so that the same story listed in several category feeds, or re-titled in a later feed, is not fetched
+# again. Lookups go through a Bloom filter kept in memory and saved beside the database, and only Bloom filter hits are
+# confirmed against the exact set of URLs stored in the database.
+
+import hashlib, math, struct, os
+import JapaneseNewsScraperConstants as constants
+from JapaneseNewsArticle import normalizeUrl
+
+class bloomFilter:
+	def __init__(self, capacity, errorRate, bits=None, hashes=None, data=None):
+		self.__bits = bits or max(8, int(-capacity * math.log(errorRate) / (math.log(2) ** 2)))
+		self.__hashes = hashes or max(1, round(self.__bits / capacity * math.log(2)))
+		self.__data = bytearray(data) if data is not None else bytearray((self.__bits + 7) // 8)
+	def getBits(self):
+		return self.__bits
+	def getHashes(self):
+		return self.__hashes
+	def getData(self):
+		return bytes(self.__data)
+	def getPositions(self, key):
+		""" Returns the bit positions of the key, derived from one digest by double hashing. """
+		digest = hashlib.blake2b(key.encode('UTF-8'), digest_size=16).digest()
+		first, second = struct.unpack('<QQ', digest)
+		return [(first + i * second) % self.__bits for i in range(self.__hashes)]
+	def add(self, key):
+		for position in self.getPositions(key):
+			self.__data[position >> 3] |= 1 << (position & 7)
+	def __contains__(self, key):
+		return all(self.__data[position >> 3] & (1 << (position & 7)) for position in self.getPositions(key))
+
+class seenUrlStore:
+	HEADER = struct.Struct('<8sQQQQ')
+	MAGIC = b'JNSBLOOM'
+	def __init__(self, conn, bloomFileName, capacity=None, errorRate=None):
+		self.__conn = conn
+		self.__bloomFileName = bloomFileName
+		self.__capacity = capacity or constants.SEEN_URL_CAPACITY
+		self.__errorRate = errorRate or constants.SEEN_URL_ERROR_RATE
+		self.__queued = set()
+		self.__hits = 0
+		self.__conn.execute(constants.CREATE_SEEN_URLS)
+		self.__count = self.__conn.execute(constants.COUNT_SEEN_URLS).fetchone()[0]
+		if self.__count == 0:
+			self.seed()
+		self.__bloom = self.loadBloomFilter()
+		if self.__bloom is None:
+			self.__bloom = self.rebuildBloomFilter()
+	def getHits(self):
+		return self.__hits
+	def seed(self):
+		""" Fills an empty seen-store with the URLs of the News Articles already in the database. """
+		urls = {normalizeUrl(url) for (url,) in self.__conn.execute(constants.SELECT_ARTICLE_URLS)}
+		with self.__conn:
+			self.__conn.executemany(constants.INSERT_SEEN_URL, [(url,) for url in urls])
+		self.__count = len(urls)
+	def loadBloomFilter(self):
+		""" Returns the Bloom filter saved beside the database, or None if it is missing, out of date, or over capacity. """
+		if not os.path.exists(self.__bloomFileName):
+			return None
+		with open(self.__bloomFileName, 'rb') as bloomFile:
+			header = bloomFile.read(self.HEADER.size)
+			if len(header) < self.HEADER.size:
+				return None
+			magic, bits, hashes, capacity, count = self.HEADER.unpack(header)
+			if magic != self.MAGIC or count != self.__count or count > capacity:
+				return None
+			data = bloomFile.read()
+		if len(data) != (bits + 7) // 8:
+			return None
+		self.__capacity = capacity
+		return bloomFilter(capacity, self.__errorRate, bits, hashes, data)
+	def rebuildBloomFilter(self):
+		""" Builds a new Bloom filter from the exact set of URLs in the database, sized with room for twice the current count. """
+		self.__capacity = max(self.__capacity, self.__count * 2)
+		bloom = bloomFilter(self.__capacity, self.__errorRate)
+		for (url,) in self.__conn.execute(constants.SELECT_SEEN_URLS):
+			bloom.add(url)
+		return bloom
+	def isSeen(self, url):
+		""" Checks whether the URL has been fetched in an earlier run, or queued for fetching earlier in this run. """
+		url = normalizeUrl(url)
+		seen = url in self.__queued or (url in self.__bloom and self.__conn.execute(constants.CHECK_SEEN_URL, (url,)).fetchone() is not None)
+		if seen:
+			self.__hits += 1
+		return seen
+	def markQueued(self, url):
+		self.__queued.add(normalizeUrl(url))
+	def unmarkQueued(self, url):
+		""" Forgets a queued URL whose fetch failed, so that it is queued again when next listed. """
+		self.__queued.discard(normalizeUrl(url))
+	def clearQueued(self):
+		""" Forgets the queued URLs once their News Articles have been written, as those written are recorded in the seen-store itself. """
+		self.__queued.clear()
+	def add(self, url):
+		""" Records the URL as fetched. The URL is written within the connection's current transaction, so it should be called from within
+		the transaction that writes the URL's News Article, such as through the batch writer's onWritten callback. """
+		url = normalizeUrl(url)
+		if url in self.__bloom and self.__conn.execute(constants.CHECK_SEEN_URL, (url,)).fetchone() is not None:
+			return
+		self.__conn.execute(constants.INSERT_SEEN_URL, (url,))
+		self.__bloom.add(url)
+		self.__count += 1
+	def save(self):
+		""" Commits the recorded URLs and saves the Bloom filter beside the database, rebuilding it first if it has filled up. """
+		self.__conn.commit()
+		if self.__count > self.__capacity:
+			self.__bloom = self.rebuildBloomFilter()
+		with open(self.__bloomFileName + '.tmp', 'wb') as bloomFile:
+			bloomFile.write(self.HEADER.pack(self.MAGIC, self.__bloom.getBits(), self.__bloom.getHashes(), self.__capacity, self.__count))
+			bloomFile.write(self.__bloom.getData())
+		os.replace(self.__bloomFileName + '.tmp', self.__bloomFileName)
@@ -1,20 +1,99 @@
+import sqlite3, argparse, collections, multiprocessing
 from tinysegmenter import TinySegmenter
+import JapaneseNewsScraperConstants as constants, JapaneseNewsScraperBodyStore as bodystore
 
 hiragana = ["ぁ", "あ", "ぃ", "い", "ぅ", "う", "ぇ", "え", "ぉ", "お", "を", "か", "が", "き", "ぎ", "く", "ぐ", "け", "げ", "こ", "ご", "さ", "ざ", "し", "じ", "す", "ず", "せ", "ぜ", "そ", "ぞ", "た", "だ", "ち", "ぢ", "っ", "つ", "づ", "て", "で", "と", "ど", "な", "に", "ぬ", "ね", "の", "は", "ば", "ぱ", "ひ", "び", "ぴ", "ふ", "ぶ", "ぷ", "へ", "べ", "ぺ", "ほ", "ぼ", "ぽ", "ま", "み", "む", "め", "も", "ゃ", "や", "ゅ", "ゆ", "ょ", "よ", "ら", "り", "る", "れ", "ろ", "ゎ", "わ", "ゐ", "ゑ", "ん", "ゔ"]
 letters = ['ａ', 'ｂ', 'ｃ', 'ｄ', 'ｅ', 'ｆ', 'ｇ', 'ｈ', 'ｉ', 'ｊ', 'ｋ', 'ｌ', 'ｍ', 'ｎ', 'ｏ', 'ｐ', 'ｑ', 'ｒ', 'ｓ', 'ｔ', 'ｕ', 'ｖ', 'ｗ', 'ｘ', 'ｙ', 'ｚ', 'Ａ', 'Ｂ', 'Ｃ', 'Ｄ', 'Ｅ', 'Ｆ', 'Ｇ', 'Ｈ', 'Ｉ', 'Ｊ', 'Ｋ', 'Ｌ', 'Ｍ', 'Ｎ', 'Ｏ', 'Ｐ', 'Ｑ', 'Ｒ', 'Ｓ', 'Ｔ', 'Ｕ', 'Ｖ', 'Ｗ', 'Ｘ', 'Ｙ', 'Ｚ']
 numbers = ["１", "２", "３", "４", "５", "６", "７", "８", "９", "０", '一', '二', '三', '四', '五', '六', '七', '八', '九', '十', '千', '万']
 common_text = ['、', '。', '。\n', '。\u3000', '\n', '\u3000', '・', '．', ' ', '。「', ' 「', '「', '、「', '「（', '」', '」\n', '」\u3000', '」「', '」（', '（', '）', '＝', '～', 'です', 'だっ', 'ます', 'まい', 'まり', 'まし', 'あり', 'ある', 'ない', 'いる', 'いない', 'おり', 'この', 'これ', 'その', 'それ', 'あの', 'あれ', 'どの', 'どれ', 'まで',  'から', 'よう', '時', '分', 'して', 'する', 'すれ', 'また', 'たり', 'なる', 'なっ', 'なり', 'こと', 'られる', 'たら', 'につ', 'ながる', 'なかっ', 'られ', 'れる', 'まか', 'あっ', 'たい' ]
 
+stopWords = frozenset(hiragana + letters + numbers + common_text)
+segmenter = TinySegmenter()
+
 def parseText(text):
-	t = TinySegmenter()
-	allWords = t.tokenize(text)
+	allWords = segmenter.tokenize(text)
 	words = trimNonWords(allWords)
 	return words
 
 def trimNonWords(allWords):
-	words = [word for word in allWords if word not in (hiragana + letters + numbers + common_text)]
+	words = [word for word in allWords if word not in stopWords]
 	return words
 
+def countWords(text):
+	""" Returns the frequency of each word of the text, as a list of (word, frequency) pairs. """
+	return list(collections.Counter(parseText(text)).items())
+
+
+################# Vocabulary Index ################################
+def createVocabularyIndex(conn):
+	""" Creates the word index tables, if they do not already exist. """
+	for sqlCreateTable in constants.CREATE_VOCABULARY_TABLES:
+		conn.execute(sqlCreateTable)
+	conn.commit()
+
+def checkVocabularyIndex(conn):
+	""" Returns the number of word index rows whose word is missing from the vocabulary, which is 0 for a consistent index. """
+	return conn.execute(constants.COUNT_UNKNOWN_INDEX_WORDS).fetchone()[0]
+
+def getLastIndexedRowid(conn, indexName):
+	row = conn.execute(constants.SELECT_INDEX_STATE, (indexName,)).fetchone()
+	return row[0] if row else 0
+
+def indexVocabulary(conn, chunkSize=None, workers=None):
+	""" Segments the News Articles added since the last run, and adds their word frequencies to the word index.
+	News Articles are read and written in chunks, one transaction per chunk, so an interrupted run resumes from the last complete chunk.
+	With workers, each chunk is segmented across that many processes. Returns the number of News Articles indexed. """
+	chunkSize = chunkSize or constants.VOCABULARY_CHUNK_SIZE
+	workers = constants.VOCABULARY_WORKERS if workers is None else workers
+	createVocabularyIndex(conn)
+	bodystore.bodyStore(conn)
+	pool = multiprocessing.get_context('spawn').Pool(workers) if workers > 0 else None
+	indexed = 0
+	try:
+		lastRowid = getLastIndexedRowid(conn, constants.VOCABULARY_INDEX_NAME)
+		while True:
+			rows = conn.execute(constants.SELECT_ARTICLES_TO_INDEX, (lastRowid, chunkSize)).fetchall()
+			if not rows:
+				break
+			texts = [title + "\n" + body for (rowid, title, body) in rows]
+			if pool is None:
+				wordCounts = [countWords(text) for text in texts]
+			else:
+				wordCounts = pool.map(countWords, texts, chunksize=max(1, len(texts) // (workers * 4)))
+			lastRowid = rows[-1][0]
+			with conn:
+				writeWordCounts(conn, [rowid for (rowid, title, body) in rows], wordCounts)
+				conn.execute(constants.UPDATE_INDEX_STATE, (constants.VOCABULARY_INDEX_NAME, lastRowid))
+			indexed += len(rows)
+	finally:
+		if pool is not None:
+			pool.close()
+			pool.join()
+	return indexed
+
+def writeWordCounts(conn, rowids, wordCounts):
+	""" Writes the word frequencies of each News Article to the word index, and adds them to the vocabulary totals. """
+	conn.executemany(constants.INSERT_WORD_INDEX, [(word, rowid, frequency) for rowid, counts in zip(rowids, wordCounts) for (word, frequency) in counts])
+	totals = collections.defaultdict(lambda: [0, 0])
+	for counts in wordCounts:
+		for (word, frequency) in counts:
+			totals[word][0] += frequency
+			totals[word][1] += 1
+	conn.executemany(constants.UPSERT_VOCABULARY, [(word, frequency, documents) for word, (frequency, documents) in totals.items()])
+
 
+###################################################
+# Beginning of the program
+###################################################
 if __name__ == '__main__':
-	pass
\ No newline at end of file
+	argumentParser = argparse.ArgumentParser(description="Adds the News Articles scraped since the last run to the word index.")
+	argumentParser.add_argument('--database', default=constants.DATABASE_NAME)
+	argumentParser.add_argument('--workers', type=int, default=None, help="number of segmenting processes; 0 segments in this process")
+	argumentParser.add_argument('--chunk-size', type=int, default=None, help="number of News Articles per transaction")
+	argumentParser.add_argument('--check', action='store_true', help="check that every word of the word index is in the vocabulary after indexing")
+	options = argumentParser.parse_args()
+	conn = sqlite3.connect(options.database)
+	print("Indexed %d News Article(s)." % indexVocabulary(conn, options.chunk_size, options.workers))
+	if options.check:
+		print("%d word index row(s) with a word missing from the vocabulary." % checkVocabularyIndex(conn))
+	conn.close()
\ No newline at end of file